@@ -0,0 +1,232 @@
+"""
+In-Process Publish-Subscribe Broker
+
+Overview:
+    - case1.py (Task 2) names publish-subscribe message brokers as the way to scale real-time delivery. Broker is an
+      in-process asyncio version: publishers send a message to a topic, and every subscriber whose pattern matches
+      the topic gets it on its own bounded queue.
+    - Topics are dot-separated words, e.g. "conversation.42.message". Patterns may use wildcards:
+        *  matches exactly one word   ("conversation.*.message")
+        #  matches zero or more words ("conversation.#")
+
+Routing index:
+    - Patterns are stored in a trie keyed by word, with separate "*" and "#" children. Publishing walks the trie along
+      the topic's words, so its cost depends on the topic length and the number of matching subscribers, never on
+      the total number of subscribers. Matches for a topic are cached until the subscriptions change, so repeated
+      publishes to a busy group chat cost O(matching subscribers).
+
+Slow consumers:
+    - Each subscription has a bounded queue (`maxsize`). When it is full the subscription's policy decides:
+        "drop_oldest":  discard the oldest queued message to make room (default)
+        "drop_new":     discard the message being published
+        "evict":        unsubscribe the slow consumer; its iterator ends after the queued messages
+    - publish() never awaits, so one slow subscriber can never stall the others.
+
+Usage:
+    broker = Broker()
+    subscription = broker.subscribe("conversation.42.*")
+    broker.publish("conversation.42.message", message)
+    async for topic, message in subscription:
+        ...
+"""
+
+import asyncio
+from collections import deque
+
+import instrumentation
+
+
+POLICIES = ("drop_oldest", "drop_new", "evict")
+DEFAULT_MAXSIZE = 1024
+
+
+class _Node:
+    __slots__ = ("children", "subscriptions")
+
+    def __init__(self):
+        self.children = {}
+        self.subscriptions = set()
+
+
+class Subscription:
+    """A subscriber's bounded queue. Iterate it with `async for topic, message in subscription`."""
+
+    def __init__(self, broker, pattern, maxsize, policy):
+        self.broker = broker
+        self.pattern = pattern
+        self.maxsize = maxsize
+        self.policy = policy
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque()
+        self._waiter = None
+
+    def _deliver(self, item):
+        if len(self._queue) >= self.maxsize:
+            if self.policy == "drop_new":
+                self.dropped += 1
+                return False
+            if self.policy == "evict":
+                self.dropped += 1
+                self.broker.unsubscribe(self)
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(item)
+        self.delivered += 1
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return True
+
+    def _close(self):
+        self.closed = True
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def qsize(self):
+        return len(self._queue)
+
+    def get_nowait(self):
+        """Return the next (topic, message) pair, or None if nothing is queued."""
+        return self._queue.popleft() if self._queue else None
+
+    def drain(self, limit=None):
+        """Return up to `limit` queued (topic, message) pairs without waiting."""
+        queue = self._queue
+        count = len(queue) if limit is None else min(limit, len(queue))
+        return [queue.popleft() for _ in range(count)]
+
+    async def get(self):
+        """Wait for the next (topic, message) pair. Raises EOFError once the subscription is closed and empty."""
+        while not self._queue:
+            if self.closed:
+                raise EOFError("subscription closed")
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._queue.popleft()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except EOFError:
+            raise StopAsyncIteration from None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self, default_maxsize=DEFAULT_MAXSIZE, default_policy="drop_oldest"):
+        if default_policy not in POLICIES:
+            raise ValueError("policy must be one of %s" % (POLICIES,))
+        self.default_maxsize = default_maxsize
+        self.default_policy = default_policy
+        self._root = _Node()
+        self._count = 0
+        self._cache = {}
+
+    @staticmethod
+    def _words(topic):
+        return topic.split(".") if topic else []
+
+    def subscribe(self, pattern, maxsize=None, policy=None):
+        policy = policy or self.default_policy
+        if policy not in POLICIES:
+            raise ValueError("policy must be one of %s" % (POLICIES,))
+        subscription = Subscription(self, pattern, maxsize or self.default_maxsize, policy)
+        node = self._root
+        for word in self._words(pattern):
+            node = node.children.setdefault(word, _Node())
+        node.subscriptions.add(subscription)
+        self._count += 1
+        self._cache.clear()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription.closed:
+            return
+        path = [self._root]
+        for word in self._words(subscription.pattern):
+            node = path[-1].children.get(word)
+            if node is None:
+                break
+            path.append(node)
+        else:
+            node = path[-1]
+            if subscription in node.subscriptions:
+                node.subscriptions.discard(subscription)
+                self._count -= 1
+                # Prune empty branches so the trie does not keep dead patterns around.
+                words = self._words(subscription.pattern)
+                for depth in range(len(words), 0, -1):
+                    node = path[depth]
+                    if node.subscriptions or node.children:
+                        break
+                    del path[depth - 1].children[words[depth - 1]]
+        self._cache.clear()
+        subscription._close()
+
+    def _collect(self, node, words, i, matches):
+        if "#" in node.children:
+            hash_node = node.children["#"]
+            # "#" swallows zero or more words: try every remaining suffix.
+            for j in range(i, len(words) + 1):
+                self._collect(hash_node, words, j, matches)
+        if i == len(words):
+            matches.update(node.subscriptions)
+            return
+        child = node.children.get(words[i])
+        if child is not None:
+            self._collect(child, words, i + 1, matches)
+        child = node.children.get("*")
+        if child is not None:
+            self._collect(child, words, i + 1, matches)
+
+    def match(self, topic):
+        """Subscriptions whose pattern matches topic."""
+        matches = self._cache.get(topic)
+        if matches is None:
+            found = set()
+            self._collect(self._root, self._words(topic), 0, found)
+            matches = tuple(found)
+            if len(self._cache) > 65536:
+                self._cache.clear()
+            self._cache[topic] = matches
+        return matches
+
+    def publish(self, topic, message):
+        """Deliver message to every matching subscriber without waiting. Returns the number of deliveries."""
+        started = instrumentation.start("broker.publish") if instrumentation.enabled else 0
+        item = (topic, message)
+        delivered = 0
+        for subscription in self.match(topic):
+            if subscription._deliver(item):
+                delivered += 1
+        if instrumentation.enabled:
+            instrumentation.count("broker.deliveries", delivered)
+            if started:
+                instrumentation.stop("broker.publish", started)
+        return delivered
+
+    def close(self):
+        for subscription in list(self.subscriptions()):
+            self.unsubscribe(subscription)
+
+    def subscriptions(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            yield from node.subscriptions
+            stack.extend(node.children.values())
+
+    def __len__(self):
+        return self._count
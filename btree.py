@@ -0,0 +1,354 @@
+"""
+Counted B+ Tree (order-statistic B-tree)
+
+Overview:
+    - case1.py (Task 1) recommends a balanced tree for ordered access. Pointer-heavy binary trees (AVL, Red-Black)
+      cost one Python object per key and a pointer chase per level. A B+ tree keeps up to `order` keys per node in
+      plain lists, so the tree is only a few levels deep even at tens of millions of keys, and each node is searched
+      with C-level bisect.
+    - Every internal node also stores the number of keys below each child. That turns the tree into an
+      order-statistic tree: the key at rank r, and the rank of a key, are found in O(log n).
+    - Leaves are linked in both directions, so range scans walk the leaves without going back up the tree.
+
+Operations (n keys, all O(log n) unless noted):
+    - insert(key, value), pop(key), get(key), key in tree
+    - rank(key):               number of keys smaller than key
+    - item_at(r):              (key, value) at rank r
+    - irange(lo, hi):          ascending or descending iteration over a key range, O(log n + m)
+    - islice(start, stop):     iteration by rank, O(log n + m)
+
+Keys must be unique and mutually comparable; inserting an existing key replaces its value.
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+DEFAULT_ORDER = 64
+
+
+class _Leaf:
+    __slots__ = ("keys", "values", "prev", "next")
+
+    def __init__(self, keys=None, values=None):
+        self.keys = keys if keys is not None else []
+        self.values = values if values is not None else []
+        self.prev = None
+        self.next = None
+
+    def size(self):
+        return len(self.keys)
+
+
+class _Internal:
+    __slots__ = ("keys", "children", "counts")
+
+    def __init__(self, keys, children, counts):
+        self.keys = keys
+        self.children = children
+        self.counts = counts
+
+    def size(self):
+        return sum(self.counts)
+
+
+class BTree:
+    def __init__(self, items=(), order=DEFAULT_ORDER):
+        if order < 4:
+            raise ValueError("order must be at least 4")
+        self._order = order
+        self._min = order // 2
+        self._root = _Leaf()
+        self._len = 0
+        for key, value in items:
+            self.insert(key, value)
+
+    # -- insertion ---------------------------------------------------------------------------------------------
+
+    def insert(self, key, value=None):
+        """Insert key -> value. Returns True if the key is new, False if an existing value was replaced."""
+        added, split = self._insert(self._root, key, value)
+        if split is not None:
+            sep, right = split
+            left = self._root
+            self._root = _Internal([sep], [left, right], [left.size(), right.size()])
+        if added:
+            self._len += 1
+        return added
+
+    def _insert(self, node, key, value):
+        if type(node) is _Leaf:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                node.values[i] = value
+                return False, None
+            keys.insert(i, key)
+            node.values.insert(i, value)
+            if len(keys) > self._order:
+                return True, self._split_leaf(node)
+            return True, None
+
+        i = bisect_right(node.keys, key)
+        added, split = self._insert(node.children[i], key, value)
+        if added:
+            node.counts[i] += 1
+        if split is not None:
+            sep, right = split
+            right_size = right.size()
+            node.keys.insert(i, sep)
+            node.children.insert(i + 1, right)
+            node.counts[i] -= right_size
+            node.counts.insert(i + 1, right_size)
+            if len(node.children) > self._order:
+                return added, self._split_internal(node)
+        return added, None
+
+    def _split_leaf(self, leaf):
+        mid = len(leaf.keys) // 2
+        right = _Leaf(leaf.keys[mid:], leaf.values[mid:])
+        del leaf.keys[mid:]
+        del leaf.values[mid:]
+        right.next = leaf.next
+        right.prev = leaf
+        if leaf.next is not None:
+            leaf.next.prev = right
+        leaf.next = right
+        return right.keys[0], right
+
+    def _split_internal(self, node):
+        mid = len(node.children) // 2
+        sep = node.keys[mid - 1]
+        right = _Internal(node.keys[mid:], node.children[mid:], node.counts[mid:])
+        del node.keys[mid - 1:]
+        del node.children[mid:]
+        del node.counts[mid:]
+        return sep, right
+
+    # -- deletion ----------------------------------------------------------------------------------------------
+
+    _MISSING = object()
+
+    def pop(self, key, default=_MISSING):
+        """Remove key and return its value."""
+        value = self._delete(self._root, key)
+        if value is BTree._MISSING:
+            if default is BTree._MISSING:
+                raise KeyError(key)
+            return default
+        self._len -= 1
+        root = self._root
+        if type(root) is _Internal and len(root.children) == 1:
+            self._root = root.children[0]
+        return value
+
+    def remove(self, key):
+        self.pop(key)
+
+    def _delete(self, node, key):
+        if type(node) is _Leaf:
+            i = bisect_left(node.keys, key)
+            if i == len(node.keys) or node.keys[i] != key:
+                return BTree._MISSING
+            del node.keys[i]
+            return node.values.pop(i)
+
+        i = bisect_right(node.keys, key)
+        child = node.children[i]
+        value = self._delete(child, key)
+        if value is BTree._MISSING:
+            return value
+        node.counts[i] -= 1
+        underflow = len(child.keys) < self._min if type(child) is _Leaf else len(child.children) < self._min
+        if underflow and len(node.children) > 1:
+            self._rebalance(node, i - 1 if i > 0 else i)
+        return value
+
+    def _rebalance(self, parent, i):
+        """Merge children i and i+1 of parent, or split their contents evenly if they do not fit in one node."""
+        left, right = parent.children[i], parent.children[i + 1]
+        if type(left) is _Leaf:
+            keys = left.keys + right.keys
+            values = left.values + right.values
+            if len(keys) <= self._order:
+                left.keys, left.values = keys, values
+                left.next = right.next
+                if right.next is not None:
+                    right.next.prev = left
+                self._drop_child(parent, i)
+                return
+            mid = len(keys) // 2
+            left.keys, left.values = keys[:mid], values[:mid]
+            right.keys, right.values = keys[mid:], values[mid:]
+            parent.keys[i] = right.keys[0]
+        else:
+            keys = left.keys + [parent.keys[i]] + right.keys
+            children = left.children + right.children
+            counts = left.counts + right.counts
+            if len(children) <= self._order:
+                left.keys, left.children, left.counts = keys, children, counts
+                self._drop_child(parent, i)
+                return
+            mid = len(children) // 2
+            left.keys, left.children, left.counts = keys[:mid - 1], children[:mid], counts[:mid]
+            right.keys, right.children, right.counts = keys[mid:], children[mid:], counts[mid:]
+            parent.keys[i] = keys[mid - 1]
+        parent.counts[i] = left.size()
+        parent.counts[i + 1] = right.size()
+
+    @staticmethod
+    def _drop_child(parent, i):
+        parent.counts[i] += parent.counts[i + 1]
+        del parent.keys[i]
+        del parent.children[i + 1]
+        del parent.counts[i + 1]
+
+    # -- lookup ------------------------------------------------------------------------------------------------
+
+    def _find_leaf(self, key):
+        node = self._root
+        while type(node) is _Internal:
+            node = node.children[bisect_right(node.keys, key)]
+        return node
+
+    def get(self, key, default=None):
+        leaf = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            return leaf.values[i]
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, BTree._MISSING)
+        if value is BTree._MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def __contains__(self, key):
+        return self.get(key, BTree._MISSING) is not BTree._MISSING
+
+    def __len__(self):
+        return self._len
+
+    def rank(self, key):
+        """Number of keys strictly smaller than key."""
+        node, rank = self._root, 0
+        while type(node) is _Internal:
+            i = bisect_right(node.keys, key)
+            rank += sum(node.counts[:i])
+            node = node.children[i]
+        return rank + bisect_left(node.keys, key)
+
+    def _locate_rank(self, r):
+        if r < 0:
+            r += self._len
+        if not 0 <= r < self._len:
+            raise IndexError("BTree rank out of range")
+        node = self._root
+        while type(node) is _Internal:
+            for i, count in enumerate(node.counts):
+                if r < count:
+                    break
+                r -= count
+            node = node.children[i]
+        return node, r
+
+    def item_at(self, r):
+        """(key, value) of the r-th smallest key."""
+        leaf, i = self._locate_rank(r)
+        return leaf.keys[i], leaf.values[i]
+
+    def min_key(self):
+        return self.item_at(0)[0]
+
+    def max_key(self):
+        return self.item_at(-1)[0]
+
+    # -- iteration ---------------------------------------------------------------------------------------------
+
+    def _first_leaf(self):
+        node = self._root
+        while type(node) is _Internal:
+            node = node.children[0]
+        return node
+
+    def _last_leaf(self):
+        node = self._root
+        while type(node) is _Internal:
+            node = node.children[-1]
+        return node
+
+    @staticmethod
+    def _walk(leaf, i, count):
+        while leaf is not None and count > 0:
+            keys, values = leaf.keys, leaf.values
+            stop = min(len(keys), i + count)
+            for j in range(i, stop):
+                yield keys[j], values[j]
+            count -= stop - i
+            leaf, i = leaf.next, 0
+
+    def items(self):
+        return self._walk(self._first_leaf(), 0, self._len)
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+    def values(self):
+        return (value for _, value in self.items())
+
+    def islice(self, start=0, stop=None):
+        """Iterate (key, value) pairs with rank in [start, stop)."""
+        start, stop, _ = slice(start, stop).indices(self._len)
+        if start >= stop:
+            return iter(())
+        leaf, i = self._locate_rank(start)
+        return self._walk(leaf, i, stop - start)
+
+    def irange(self, min_key=None, max_key=None, inclusive=(True, True), reverse=False):
+        """Iterate (key, value) pairs with min_key <= key <= max_key (bounds optional)."""
+        if reverse:
+            return self._irange_reverse(min_key, max_key, inclusive)
+        return self._irange(min_key, max_key, inclusive)
+
+    def _irange(self, min_key, max_key, inclusive):
+        if min_key is None:
+            leaf, i = self._first_leaf(), 0
+        else:
+            leaf = self._find_leaf(min_key)
+            i = (bisect_left if inclusive[0] else bisect_right)(leaf.keys, min_key)
+        while leaf is not None:
+            keys, values = leaf.keys, leaf.values
+            for j in range(i, len(keys)):
+                key = keys[j]
+                if max_key is not None and (max_key < key or (key == max_key and not inclusive[1])):
+                    return
+                yield key, values[j]
+            leaf, i = leaf.next, 0
+
+    def _irange_reverse(self, min_key, max_key, inclusive):
+        if max_key is None:
+            leaf = self._last_leaf()
+            i = len(leaf.keys)
+        else:
+            leaf = self._find_leaf(max_key)
+            i = (bisect_right if inclusive[1] else bisect_left)(leaf.keys, max_key)
+        while leaf is not None:
+            keys, values = leaf.keys, leaf.values
+            for j in range(i - 1, -1, -1):
+                key = keys[j]
+                if min_key is not None and (key < min_key or (key == min_key and not inclusive[0])):
+                    return
+                yield key, values[j]
+            leaf = leaf.prev
+            if leaf is not None:
+                i = len(leaf.keys)
+
+    def clear(self):
+        self._root = _Leaf()
+        self._len = 0
@@ -81,10 +81,13 @@ Alternative Algorithms:
 -----------------------
 1. Merge Sort (O(n log n)): 
     - Merge Sort is an algorithm that has a better time complexity of O(n log n), which is significantly faster than Bubble Sort for large datasets.
+    - For datasets larger than memory, external_sort.py sorts memory-bounded chunks on all cores, spills them to disk and k-way merges them back as a stream.
 2. Quick Sort (O(n log n)): 
     - Quick Sort is another algorithm that, on average, performs very well with a time complexity of O(n log n). However, it has a worst-case complexity of O(n^2), though this can be mitigated with random pivot selection or other optimizations.
 3. Insertion Sort (O(n^2)): 
     - Insertion Sort also has O(n^2) time complexity in the worst case, but it performs well on small or nearly sorted datasets. It may be a better option for smaller arrays compared to Bubble Sort.
+4. Hybrid Sort / Timsort (O(n log n), best case O(n)):
+    - Combines the last three ideas: natural runs keep the O(n) early exit for sorted input, binary insertion sort handles short runs, and galloping merges combine them. Implemented in hybrid_sort.py (hybrid_sort(arr, key=None, reverse=False)).
 
 
 
@@ -0,0 +1,153 @@
+"""
+Conversation Filter Indexes
+
+Overview:
+    - case1.py (Task 3) lists three ways to filter conversations: by user, by read/unread status and by tags. Each of
+      them gets a secondary index here, kept up to date incrementally from membership, tag, message and read events,
+      so filtering never scans the conversation list.
+
+Indexes:
+    - participants:  user -> set of conversation ids (and the reverse, conversation -> users)
+    - tags:          tag -> set of conversation ids (postings lists)
+    - unread:        user -> {conversation id: unread count}, holding only conversations with unread messages, plus
+                     a counted B+ tree per user ordered by unread count for "most unread first"
+
+Compound filters:
+    - filter(user="bob", unread=True, tags=["project-x"], participants=["alice"]) collects the matching posting sets,
+      sorts them by size and intersects starting from the smallest, stopping as soon as the result is empty. The cost
+      is bounded by the smallest set, not by the number of conversations.
+
+Event costs: on_message is O(participants) (every other participant gets one more unread message), on_read,
+tag/untag and add/remove participant are O(log n) or better.
+"""
+
+from btree import BTree
+
+
+class ConversationFilters:
+    def __init__(self):
+        self._participants = {}
+        self._members = {}
+        self._tags = {}
+        self._conversation_tags = {}
+        self._unread = {}
+        self._unread_order = {}
+
+    # -- membership and tags ---------------------------------------------------------------------------------------
+
+    def add_participant(self, conversation_id, user_id):
+        self._participants.setdefault(user_id, set()).add(conversation_id)
+        self._members.setdefault(conversation_id, set()).add(user_id)
+
+    def remove_participant(self, conversation_id, user_id):
+        self._discard(self._participants, user_id, conversation_id)
+        self._discard(self._members, conversation_id, user_id)
+        self._set_unread(user_id, conversation_id, 0)
+
+    def tag(self, conversation_id, tag):
+        self._tags.setdefault(tag, set()).add(conversation_id)
+        self._conversation_tags.setdefault(conversation_id, set()).add(tag)
+
+    def untag(self, conversation_id, tag):
+        self._discard(self._tags, tag, conversation_id)
+        self._discard(self._conversation_tags, conversation_id, tag)
+
+    def remove_conversation(self, conversation_id):
+        for user_id in list(self._members.get(conversation_id, ())):
+            self.remove_participant(conversation_id, user_id)
+        for tag in list(self._conversation_tags.get(conversation_id, ())):
+            self.untag(conversation_id, tag)
+
+    @staticmethod
+    def _discard(index, key, value):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    # -- unread counts ---------------------------------------------------------------------------------------------
+
+    def _set_unread(self, user_id, conversation_id, count):
+        counts = self._unread.get(user_id)
+        old = counts.get(conversation_id, 0) if counts is not None else 0
+        if old == count:
+            return
+        if old:
+            order = self._unread_order[user_id]
+            order.pop((-old, conversation_id))
+            if count:
+                counts[conversation_id] = count
+                order.insert((-count, conversation_id))
+            else:
+                del counts[conversation_id]
+                if not counts:
+                    del self._unread[user_id]
+                    del self._unread_order[user_id]
+        else:
+            self._unread.setdefault(user_id, {})[conversation_id] = count
+            self._unread_order.setdefault(user_id, BTree()).insert((-count, conversation_id))
+
+    def on_message(self, conversation_id, sender_id):
+        """A new message: every participant except the sender has one more unread message."""
+        for user_id in self._members.get(conversation_id, ()):
+            if user_id != sender_id:
+                self._set_unread(user_id, conversation_id, self.unread_count(user_id, conversation_id) + 1)
+
+    def on_read(self, conversation_id, user_id, count=None):
+        """The user read `count` messages (all of them if count is None)."""
+        remaining = 0 if count is None else max(0, self.unread_count(user_id, conversation_id) - count)
+        self._set_unread(user_id, conversation_id, remaining)
+
+    def unread_count(self, user_id, conversation_id):
+        counts = self._unread.get(user_id)
+        return counts.get(conversation_id, 0) if counts is not None else 0
+
+    def most_unread(self, user_id, count):
+        """[(conversation_id, unread count)] with the most unread messages first."""
+        order = self._unread_order.get(user_id)
+        if order is None:
+            return []
+        return [(conversation_id, -negative) for (negative, conversation_id), _ in order.islice(0, count)]
+
+    # -- queries ---------------------------------------------------------------------------------------------------
+
+    def conversations_of(self, user_id):
+        return self._participants.get(user_id, frozenset())
+
+    def tagged(self, tag):
+        return self._tags.get(tag, frozenset())
+
+    def unread_conversations(self, user_id):
+        counts = self._unread.get(user_id)
+        return counts.keys() if counts is not None else frozenset()
+
+    def filter(self, user=None, unread=False, tags=(), participants=()):
+        """
+        Conversation ids matching every given condition:
+            user:          conversations `user` takes part in (and whose unread status is checked)
+            unread:        only conversations with unread messages for `user`
+            tags:          conversations carrying all of these tags
+            participants:  conversations all of these users take part in
+        """
+        if unread and user is None:
+            raise ValueError("unread filtering needs a user")
+        postings = [self.tagged(tag) for tag in tags]
+        postings += [self.conversations_of(p) for p in participants]
+        if user is not None:
+            postings.append(self.unread_conversations(user) if unread else self.conversations_of(user))
+        if not postings:
+            raise ValueError("filter needs at least one condition")
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            # Probe the larger posting once per surviving id; intersection_update would iterate all of it.
+            result = {conversation_id for conversation_id in result if conversation_id in posting}
+        return result
+
+    def ordered(self, conversation_ids, conversation_index):
+        """Sort a filter result into inbox order using a ConversationIndex."""
+        conversations = [conversation_index.get(i) for i in conversation_ids]
+        return sorted((c for c in conversations if c is not None), key=lambda c: c.sort_key())
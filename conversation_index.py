@@ -0,0 +1,121 @@
+"""
+Conversation List Index
+
+Overview:
+    - Implements the hybrid recommended at the end of case1.py (Task 3): a hash table by conversation id for direct
+      lookups, plus a balanced tree (the counted B+ tree from btree.py) that keeps conversations ordered by last
+      activity. The inbox never has to be re-sorted.
+    - Order: pinned conversations first, then most recent activity first, ties broken by conversation id. The tree key
+      is (0 if pinned else 1, -last_activity, conversation_id), so the first key in the tree is the top of the inbox.
+
+Operations (n conversations):
+    - touch(id, timestamp):   a new message moves the conversation to its new place, O(log n)
+    - pin / unpin / remove:   O(log n)
+    - get(id):                O(1)
+    - top(count):             O(log n + count)
+    - page(cursor, limit):    O(log n + limit); the cursor is the position of the last conversation returned, so
+                              pages stay consistent while conversations move
+    - position(id):           rank in the inbox, O(log n)
+"""
+
+from btree import BTree, DEFAULT_ORDER
+
+
+class Conversation:
+    __slots__ = ("conversation_id", "last_activity", "last_message_id", "pinned")
+
+    def __init__(self, conversation_id, last_activity=0, last_message_id=None, pinned=False):
+        self.conversation_id = conversation_id
+        self.last_activity = last_activity
+        self.last_message_id = last_message_id
+        self.pinned = pinned
+
+    def sort_key(self):
+        return 0 if self.pinned else 1, -self.last_activity, self.conversation_id
+
+    def __repr__(self):
+        return "Conversation(%r, last_activity=%r, last_message_id=%r, pinned=%r)" % (
+            self.conversation_id, self.last_activity, self.last_message_id, self.pinned)
+
+
+class ConversationIndex:
+    def __init__(self, order=DEFAULT_ORDER):
+        self._by_id = {}
+        self._order = BTree(order=order)
+
+    def _reposition(self, conversation, update):
+        self._order.pop(conversation.sort_key())
+        update(conversation)
+        self._order.insert(conversation.sort_key(), conversation)
+
+    def add(self, conversation_id, last_activity=0, pinned=False):
+        """Add a conversation (or return the existing one)."""
+        conversation = self._by_id.get(conversation_id)
+        if conversation is None:
+            conversation = Conversation(conversation_id, last_activity, pinned=pinned)
+            self._by_id[conversation_id] = conversation
+            self._order.insert(conversation.sort_key(), conversation)
+        return conversation
+
+    def touch(self, conversation_id, timestamp, message_id=None):
+        """Record activity; creates the conversation if needed. Older timestamps than the current one are ignored."""
+        conversation = self._by_id.get(conversation_id)
+        if conversation is None:
+            conversation = self.add(conversation_id, timestamp)
+            conversation.last_message_id = message_id
+            return conversation
+        if timestamp >= conversation.last_activity:
+            def update(c):
+                c.last_activity = timestamp
+                c.last_message_id = message_id
+            self._reposition(conversation, update)
+        return conversation
+
+    def pin(self, conversation_id, pinned=True):
+        conversation = self._by_id[conversation_id]
+        if conversation.pinned != pinned:
+            self._reposition(conversation, lambda c: setattr(c, "pinned", pinned))
+        return conversation
+
+    def unpin(self, conversation_id):
+        return self.pin(conversation_id, False)
+
+    def remove(self, conversation_id):
+        conversation = self._by_id.pop(conversation_id)
+        self._order.pop(conversation.sort_key())
+        return conversation
+
+    def get(self, conversation_id, default=None):
+        return self._by_id.get(conversation_id, default)
+
+    def __contains__(self, conversation_id):
+        return conversation_id in self._by_id
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        """Conversations in inbox order."""
+        return self._order.values()
+
+    def top(self, count):
+        """The first `count` conversations in inbox order."""
+        return [conversation for _, conversation in self._order.islice(0, count)]
+
+    def page(self, cursor=None, limit=50):
+        """
+        Return (conversations, next_cursor) for the page after `cursor` (None for the first page).
+        next_cursor is None when there are no more conversations.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        items = []
+        for _, conversation in self._order.irange(cursor, None, (False, True)):
+            if len(items) == limit:
+                return items, items[-1].sort_key()
+            items.append(conversation)
+        return items, None
+
+    def position(self, conversation_id):
+        """Rank of a conversation in inbox order (0 is the top)."""
+        return self._order.rank(self._by_id[conversation_id].sort_key())
@@ -0,0 +1,204 @@
+"""
+Priority Dispatch Queue
+
+Overview:
+    - case1.py (Task 2) names priority queues (heaps) for real-time delivery. heapq alone has no way to change or
+      remove an entry, so reprioritizing is usually done with lazy deletion: push a new entry and skip the stale one
+      when it surfaces. With frequent reprioritization (e.g. a recipient comes online) the heap grows without bound.
+    - DispatchQueue is an indexed d-ary heap: a dict maps every message id to its position in the heap array, so an
+      entry can be moved or removed in place. The heap never holds more entries than there are queued messages.
+
+Complexity (n queued messages, d = arity):
+    - push, pop, update (change priority), cancel:   O(log_d n)
+    - pop_batch(k):                                   O(k log_d n) under a single lock acquisition
+    - peek, len, membership:                          O(1)
+
+Lower priority values are delivered first; equal priorities are delivered in push order. The queue is thread-safe,
+and pop/pop_batch can block until messages arrive. Draining many messages per call amortizes the lock and wakeup
+cost over the whole batch.
+"""
+
+import itertools
+import threading
+import time
+
+import instrumentation
+
+
+DEFAULT_ARITY = 4
+
+
+class DispatchQueue:
+    def __init__(self, arity=DEFAULT_ARITY):
+        if arity < 2:
+            raise ValueError("arity must be at least 2")
+        self._arity = arity
+        # Entries are (priority, sequence, message_id, message); the sequence makes ties FIFO and keeps
+        # comparisons from ever reaching message_id or message.
+        self._heap = []
+        self._positions = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+
+    # -- heap primitives (caller holds the lock) -------------------------------------------------------------------
+
+    def _place(self, i, entry):
+        self._heap[i] = entry
+        self._positions[entry[2]] = i
+
+    def _sift_up(self, i):
+        heap, arity = self._heap, self._arity
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) // arity
+            if not entry < heap[parent]:
+                break
+            self._place(i, heap[parent])
+            i = parent
+        self._place(i, entry)
+
+    def _sift_down(self, i):
+        heap, arity = self._heap, self._arity
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            first = arity * i + 1
+            if first >= n:
+                break
+            best = min(range(first, min(first + arity, n)), key=heap.__getitem__)
+            if not heap[best] < entry:
+                break
+            self._place(i, heap[best])
+            i = best
+        self._place(i, entry)
+
+    def _remove_at(self, i):
+        heap = self._heap
+        entry = heap[i]
+        del self._positions[entry[2]]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self._positions[last[2]] = i
+            if i > 0 and last < heap[(i - 1) // self._arity]:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+        return entry
+
+    def _push(self, message_id, message, priority):
+        i = self._positions.get(message_id)
+        entry = (priority, next(self._sequence), message_id, message)
+        if i is None:
+            self._heap.append(entry)
+            self._sift_up(len(self._heap) - 1)
+        else:
+            old = self._heap[i]
+            self._heap[i] = entry
+            if entry < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+
+    # -- public API ------------------------------------------------------------------------------------------------
+
+    def push(self, message_id, message, priority=0):
+        """Queue a message. Pushing an id that is already queued replaces its message and priority."""
+        started = instrumentation.start("queue.push") if instrumentation.enabled else 0
+        with self._lock:
+            self._push(message_id, message, priority)
+            self._not_empty.notify()
+        if started:
+            instrumentation.stop("queue.push", started)
+
+    def push_many(self, items):
+        """Queue (message_id, message, priority) tuples under one lock acquisition."""
+        with self._lock:
+            count = 0
+            for message_id, message, priority in items:
+                self._push(message_id, message, priority)
+                count += 1
+            self._not_empty.notify(count)
+
+    def update(self, message_id, priority):
+        """Change the priority of a queued message. Raises KeyError if it is not queued."""
+        with self._lock:
+            i = self._positions[message_id]
+            old = self._heap[i]
+            entry = (priority, old[1], message_id, old[3])
+            self._heap[i] = entry
+            if entry < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+
+    def cancel(self, message_id):
+        """Remove a queued message and return it. Raises KeyError if it is not queued."""
+        with self._lock:
+            return self._remove_at(self._positions[message_id])[3]
+
+    def discard(self, message_id):
+        with self._lock:
+            i = self._positions.get(message_id)
+            if i is not None:
+                self._remove_at(i)
+
+    def _wait(self, block, timeout):
+        if not block:
+            return bool(self._heap)
+        if timeout is None:
+            while not self._heap:
+                self._not_empty.wait()
+            return True
+        deadline = time.monotonic() + timeout
+        while not self._heap:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._not_empty.wait(remaining)
+        return True
+
+    def pop(self, block=True, timeout=None):
+        """Remove and return (message_id, message) with the lowest priority. Returns None on timeout/empty."""
+        with self._lock:
+            if not self._wait(block, timeout):
+                return None
+            # Timed from here on, so waiting for a message does not count as pop latency.
+            started = instrumentation.start("queue.pop") if instrumentation.enabled else 0
+            entry = self._remove_at(0)
+        if started:
+            instrumentation.stop("queue.pop", started)
+        return entry[2], entry[3]
+
+    def pop_batch(self, k, block=True, timeout=None):
+        """Remove and return up to k (message_id, message) pairs in priority order, waiting for at least one."""
+        with self._lock:
+            if not self._wait(block, timeout):
+                return []
+            started = instrumentation.start("queue.pop_batch") if instrumentation.enabled else 0
+            batch = []
+            while self._heap and len(batch) < k:
+                entry = self._remove_at(0)
+                batch.append((entry[2], entry[3]))
+        if started:
+            instrumentation.stop("queue.pop_batch", started)
+        return batch
+
+    def peek(self):
+        """(message_id, message, priority) of the next message, or None."""
+        with self._lock:
+            if not self._heap:
+                return None
+            priority, _, message_id, message = self._heap[0]
+            return message_id, message, priority
+
+    def priority_of(self, message_id):
+        with self._lock:
+            return self._heap[self._positions[message_id]][0]
+
+    def __contains__(self, message_id):
+        return message_id in self._positions
+
+    def __len__(self):
+        return len(self._heap)
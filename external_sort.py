@@ -0,0 +1,169 @@
+"""
+External Merge Sort
+
+Overview:
+    - case2.py (Task 3) recommends Merge Sort for large datasets. Our message archives do not fit in memory, so the
+      merge has to happen on disk.
+    - external_sort streams any iterable through memory-bounded chunks and yields the items back in sorted order.
+
+How it works:
+    1. Split: items are collected into chunks until the chunk's estimated size reaches its share of the budget. Sizes
+       are deep estimates (message_record.estimate_size), so the fields of dicts and Message objects are counted too.
+    2. Sort: each chunk is sorted in a ProcessPoolExecutor worker (all cores by default) and spilled to a temp file.
+       At most `workers` chunks are in flight. An in-flight chunk exists twice, pickled on its way to the worker and
+       unpickled inside it, so the budget is split into 2 * workers + 1 chunk shares and memory stays near
+       `memory_budget`.
+    3. Merge: the sorted chunk files are k-way merged with a heap (heapq.merge) and yielded one item at a time.
+       If there are more than `max_fan_in` chunk files, groups of them are merged into intermediate files first so
+       we never hold too many files open.
+
+Input that fits in a single chunk is sorted in memory without touching the disk or the process pool.
+
+Usage:
+    for message in external_sort(read_archive(), key=operator.itemgetter("timestamp"), memory_budget=256 << 20):
+        ...
+
+Notes:
+    - Items must be picklable, and so must `key` (a module-level function or operator.itemgetter, not a lambda),
+      because both are sent to the worker processes.
+    - The sort is stable: ties keep their input order.
+    - The pool starts lazily, once the second chunk is full. If the caller has other threads running by then, pass
+      a "forkserver" or "spawn" mp_context: forking a multi-threaded process can deadlock the child.
+"""
+
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+from message_record import estimate_size
+
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+DEFAULT_MAX_FAN_IN = 128
+BLOCK_SIZE = 1024
+
+
+def _write_run(items, path):
+    with open(path, "wb") as f:
+        for start in range(0, len(items), BLOCK_SIZE):
+            pickle.dump(items[start:start + BLOCK_SIZE], f, pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+def _sort_chunk(items, key, reverse, path):
+    # list.sort is the same run/gallop algorithm as hybrid_sort, but runs in C inside the worker.
+    items.sort(key=key, reverse=reverse)
+    _write_run(items, path)
+    return path
+
+
+def _merge_to_file(paths, key, reverse, path):
+    with open(path, "wb") as f:
+        block = []
+        for item in heapq.merge(*(_read_run(p) for p in paths), key=key, reverse=reverse):
+            block.append(item)
+            if len(block) == BLOCK_SIZE:
+                pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+                block = []
+        if block:
+            pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+    for p in paths:
+        os.remove(p)
+    return path
+
+
+def _chunks(iterable, chunk_bytes):
+    chunk, size = [], 0
+    for item in iterable:
+        chunk.append(item)
+        size += estimate_size(item)
+        if size >= chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def external_sort(iterable, key=None, reverse=False, memory_budget=DEFAULT_MEMORY_BUDGET, workers=None,
+                  max_fan_in=DEFAULT_MAX_FAN_IN, tmp_dir=None, mp_context=None):
+    """
+    Yield the items of iterable in sorted order, spilling sorted chunks to disk to stay within memory_budget.
+    mp_context is the multiprocessing context the worker pool starts its processes with (the default if None).
+    """
+    # Timed from the first item requested until the output is exhausted or closed.
+    started = instrumentation.start("sort.external_sort") if instrumentation.enabled else 0
+    try:
+        yield from _external_sort(iterable, key, reverse, memory_budget, workers, max_fan_in, tmp_dir, mp_context)
+    finally:
+        if started:
+            instrumentation.stop("sort.external_sort", started)
+
+
+def _external_sort(iterable, key, reverse, memory_budget, workers, max_fan_in, tmp_dir, mp_context):
+    if memory_budget <= 0:
+        raise ValueError("memory_budget must be positive")
+    if max_fan_in < 2:
+        raise ValueError("max_fan_in must be at least 2")
+    workers = workers or os.cpu_count() or 1
+    # One chunk being filled here plus up to `workers` chunks in flight, each one pickled and unpickled.
+    chunk_bytes = max(1, memory_budget // (2 * workers + 1))
+
+    chunks = _chunks(iterable, chunk_bytes)
+    first = next(chunks, None)
+    if first is None:
+        return
+    second = next(chunks, None)
+    if second is None:
+        first.sort(key=key, reverse=reverse)
+        yield from first
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="external_sort_", dir=tmp_dir)
+    try:
+        paths = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            pending = deque()
+
+            def submit(chunk):
+                path = os.path.join(work_dir, "run_%06d.pkl" % (len(paths) + len(pending)))
+                pending.append(pool.submit(_sort_chunk, chunk, key, reverse, path))
+
+            for chunk in (first, second):
+                submit(chunk)
+            first = second = None
+            for chunk in chunks:
+                if len(pending) >= workers:
+                    paths.append(pending.popleft().result())
+                submit(chunk)
+            while pending:
+                paths.append(pending.popleft().result())
+
+            # Reduce the number of runs until a single heap merge can handle them. Groups are consecutive runs,
+            # so the merge order (and therefore stability) is preserved.
+            level = 0
+            while len(paths) > max_fan_in:
+                merged = []
+                for start in range(0, len(paths), max_fan_in):
+                    group = paths[start:start + max_fan_in]
+                    path = os.path.join(work_dir, "merge_%d_%06d.pkl" % (level, len(merged)))
+                    merged.append(pool.submit(_merge_to_file, group, key, reverse, path))
+                paths = [future.result() for future in merged]
+                level += 1
+
+        yield from heapq.merge(*(_read_run(p) for p in paths), key=key, reverse=reverse)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
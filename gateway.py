@@ -0,0 +1,352 @@
+"""
+Real-Time Delivery Gateway (WebSockets, Long Polling, Polling)
+
+Overview:
+    - case1.py (Task 2) compares polling, long polling and WebSockets. Gateway serves all three over one delivery core:
+      every client, whatever the technique, is a subscription on the same Broker (broker.py), so the techniques can be
+      compared on equal terms (see gateway_bench.py for the measurements).
+    - Plain asyncio streams with a minimal HTTP/1.1 and WebSocket (RFC 6455) implementation, no dependencies.
+
+Endpoints:
+    - GET  /ws?topic=T                      WebSocket upgrade. Every message published to a topic matching T is
+                                            pushed as one binary frame.
+    - GET  /poll?topic=T&session=S          Long poll. Waits up to `timeout` seconds (default poll_timeout) for
+           [&timeout=SECONDS]               messages and returns everything queued for session S. With timeout=0 it
+                                            answers immediately, which is plain polling. The session keeps its
+                                            subscription between requests, so nothing is lost between polls; idle
+                                            sessions expire after session_ttl seconds.
+    - POST /publish?topic=T                 Publish the request body to topic T. Answers with the delivery count.
+    - GET  /stats                           JSON with connection counts and the process RSS.
+
+Poll responses are application/octet-stream: each message is a 4-byte big-endian length followed by its bytes.
+HTTP connections are kept alive, so a long-poll client reuses one TCP connection.
+
+Usage:
+    python gateway.py --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from broker import Broker
+
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_BODY = 16 * 1024 * 1024
+LENGTH = struct.Struct(">I")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+# -- WebSocket framing (shared with the load generator) ----------------------------------------------------------------
+
+def encode_frame(opcode, payload, mask=False):
+    """Encode one final WebSocket frame. Clients must mask their frames, servers must not."""
+    length = len(payload)
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack(">H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack(">Q", length)
+    if not mask:
+        return bytes(header) + payload
+    key = os.urandom(4)
+    return bytes(header) + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload, key):
+    # XOR through big ints: one C-level operation instead of a Python loop per byte.
+    if not payload:
+        return b""
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
+
+
+async def read_frame(reader):
+    """Read one frame and return (fin, opcode, payload), unmasking if needed."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack(">H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack(">Q", await reader.readexactly(8))
+    if length > MAX_BODY:
+        raise ValueError("frame too large")
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if key is not None:
+        payload = _apply_mask(payload, key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+async def read_message(reader):
+    """Read one complete data message, joining continuation frames. Returns (opcode, payload)."""
+    fin, opcode, payload = await read_frame(reader)
+    if fin or opcode >= OP_CLOSE:
+        return opcode, payload
+    parts = [payload]
+    while True:
+        fin, _, payload = await read_frame(reader)
+        parts.append(payload)
+        if fin:
+            return opcode, b"".join(parts)
+
+
+def websocket_accept(key):
+    return base64.b64encode(hashlib.sha1(key.encode("ascii") + WS_GUID).digest()).decode("ascii")
+
+
+def encode_messages(messages):
+    return b"".join(LENGTH.pack(len(m)) + m for m in messages)
+
+
+def decode_messages(body):
+    messages, position = [], 0
+    while position < len(body):
+        (length,) = LENGTH.unpack_from(body, position)
+        position += LENGTH.size
+        messages.append(body[position:position + length])
+        position += length
+    return messages
+
+
+def process_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# -- server -------------------------------------------------------------------------------------------------------
+
+class _PollSession:
+    __slots__ = ("subscription", "last_seen", "busy")
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self.last_seen = time.monotonic()
+        self.busy = False
+
+
+class Gateway:
+    def __init__(self, broker=None, host="127.0.0.1", port=8765, poll_timeout=30.0, session_ttl=60.0,
+                 queue_size=1024):
+        self.broker = broker if broker is not None else Broker(default_maxsize=queue_size)
+        self.host = host
+        self.port = port
+        self.poll_timeout = poll_timeout
+        self.session_ttl = session_ttl
+        self.queue_size = queue_size
+        self.connections = 0
+        self.websockets = 0
+        self._sessions = {}
+        self._server = None
+        self._janitor = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._janitor = asyncio.ensure_future(self._expire_sessions())
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._janitor is not None:
+            self._janitor.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.broker.close()
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "websockets": self.websockets,
+            "poll_sessions": len(self._sessions),
+            "subscriptions": len(self.broker),
+            "rss_bytes": process_rss(),
+        }
+
+    async def _expire_sessions(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.session_ttl / 4))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id, session in list(self._sessions.items()):
+                if not session.busy and session.last_seen < cutoff:
+                    del self._sessions[session_id]
+                    session.subscription.close()
+
+    # -- HTTP --------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def _read_request(reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        return method, url.path, query, headers, body
+
+    @staticmethod
+    def _respond(writer, status, body=b"", content_type="text/plain"):
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n\r\n"
+                     % (status, REASONS[status].encode(), content_type.encode(), len(body)) + body)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_websocket(reader, writer, query, headers)
+                    break
+                if path == "/poll":
+                    await self._serve_poll(writer, query)
+                elif path == "/publish":
+                    if method != "POST":
+                        self._respond(writer, 405)
+                    else:
+                        delivered = self.broker.publish(query.get("topic", ""), body)
+                        self._respond(writer, 200, str(delivered).encode())
+                elif path == "/stats":
+                    self._respond(writer, 200, json.dumps(self.stats()).encode(), "application/json")
+                else:
+                    self._respond(writer, 404)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    # -- long polling ------------------------------------------------------------------------------------------------
+
+    async def _serve_poll(self, writer, query):
+        topic = query.get("topic")
+        session_id = query.get("session")
+        if not topic or not session_id:
+            self._respond(writer, 400, b"topic and session are required")
+            return
+        timeout = float(query.get("timeout", self.poll_timeout))
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _PollSession(self.broker.subscribe(topic, self.queue_size))
+        subscription = session.subscription
+        session.busy = True
+        try:
+            messages = [message for _, message in subscription.drain()]
+            if not messages and timeout > 0:
+                try:
+                    _, message = await asyncio.wait_for(subscription.get(), timeout)
+                    messages.append(message)
+                    messages.extend(message for _, message in subscription.drain())
+                except (asyncio.TimeoutError, EOFError):
+                    pass
+        finally:
+            session.busy = False
+            session.last_seen = time.monotonic()
+        self._respond(writer, 200, encode_messages(messages), "application/octet-stream")
+
+    # -- WebSockets --------------------------------------------------------------------------------------------------
+
+    async def _serve_websocket(self, reader, writer, query, headers):
+        key = headers.get("sec-websocket-key")
+        topic = query.get("topic")
+        if not key or not topic:
+            self._respond(writer, 400, b"topic and Sec-WebSocket-Key are required")
+            return
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: %s\r\n\r\n" % websocket_accept(key).encode())
+        await writer.drain()
+        subscription = self.broker.subscribe(topic, self.queue_size)
+        self.websockets += 1
+        sender = asyncio.ensure_future(self._ws_send(writer, subscription))
+        receiver = asyncio.ensure_future(self._ws_receive(reader, writer))
+        try:
+            await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.websockets -= 1
+            subscription.close()
+            for task in (sender, receiver):
+                task.cancel()
+            await asyncio.gather(sender, receiver, return_exceptions=True)
+
+    @staticmethod
+    async def _ws_send(writer, subscription):
+        while True:
+            try:
+                _, message = await subscription.get()
+            except EOFError:
+                writer.write(encode_frame(OP_CLOSE, struct.pack(">H", 1008)))
+                return
+            writer.write(encode_frame(OP_BINARY, message))
+            # Whatever else is already queued goes out in the same write batch.
+            for _, message in subscription.drain():
+                writer.write(encode_frame(OP_BINARY, message))
+            await writer.drain()
+
+    @staticmethod
+    async def _ws_receive(reader, writer):
+        while True:
+            opcode, payload = await read_message(reader)
+            if opcode == OP_CLOSE:
+                writer.write(encode_frame(OP_CLOSE, payload[:2]))
+                return
+            if opcode == OP_PING:
+                writer.write(encode_frame(OP_PONG, payload))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WebSocket / long-poll delivery gateway.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--poll-timeout", type=float, default=30.0)
+    parser.add_argument("--queue-size", type=int, default=1024)
+    args = parser.parse_args(argv)
+    gateway = Gateway(host=args.host, port=args.port, poll_timeout=args.poll_timeout, queue_size=args.queue_size)
+    try:
+        asyncio.run(gateway.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Gateway Load Generator
+
+Overview:
+    - Replaces the qualitative Polling / Long Polling / WebSockets table in case1.py (Task 2) with measured numbers.
+    - For each technique a fresh gateway (gateway.py) is started in its own process, N simulated clients connect to it
+      over localhost and subscribe to one group-chat topic, and a publisher sends messages through POST /publish.
+      Every message is delivered to every client (fan-out).
+
+Reported per technique:
+    - throughput_msgs_per_s:  deliveries per second, from the first publish to the last delivery
+    - p50_ms / p99_ms / max_ms: delivery latency (publish time to client receive time, both CLOCK_MONOTONIC)
+    - memory_per_connection_bytes: gateway RSS growth after all clients connected, divided by N
+    - delivered / expected:   messages received by clients versus N * messages
+
+Usage:
+    python gateway_bench.py --clients 10000 --messages 20 --techniques websocket long_poll poll --out gateway.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+from gateway import (Gateway, OP_BINARY, OP_CLOSE, decode_messages, encode_frame, read_message)
+
+
+TECHNIQUES = ("websocket", "long_poll", "poll")
+STAMP = struct.Struct(">QI")
+TOPIC = "bench.room"
+
+
+def _raise_fd_limit():
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _serve(host, port, queue_size):
+    _raise_fd_limit()
+    gateway = Gateway(host=host, port=port, queue_size=queue_size, poll_timeout=10.0)
+    try:
+        asyncio.run(gateway.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.delivered = 0
+        self.first_sent = None
+        self.last_received = None
+
+    def record(self, payload, now):
+        sent, _ = STAMP.unpack_from(payload)
+        self.latencies.append(now - sent)
+        self.delivered += 1
+        self.last_received = now
+
+
+# -- HTTP helpers ---------------------------------------------------------------------------------------------------
+
+async def http_request(reader, writer, method, path, body=b""):
+    writer.write(b"%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n"
+                 % (method.encode(), path.encode(), len(body)) + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length) if length else b""
+
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await http_request(reader, writer, "GET", "/stats")
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+async def wait_for_port(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+# -- clients --------------------------------------------------------------------------------------------------------
+
+async def websocket_client(host, port, index, recorder, connected):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = "YmVuY2gtY2xpZW50LSVkMDA="
+    writer.write(("GET /ws?topic=%s HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  "Sec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\n\r\n" % (TOPIC, key)).encode())
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    connected()
+    try:
+        while True:
+            opcode, payload = await read_message(reader)
+            if opcode == OP_BINARY:
+                recorder.record(payload, time.monotonic_ns())
+            elif opcode == OP_CLOSE:
+                return
+    finally:
+        try:
+            writer.write(encode_frame(OP_CLOSE, b"", mask=True))
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def poll_client(host, port, index, recorder, connected, timeout, interval):
+    reader, writer = await asyncio.open_connection(host, port)
+    path = "/poll?topic=%s&session=c%d&timeout=" % (TOPIC, index)
+    first = True
+    try:
+        while True:
+            # The first request only opens the session, so it returns at once.
+            _, body = await http_request(reader, writer, "GET", path + ("0" if first else str(timeout)))
+            now = time.monotonic_ns()
+            if first:
+                connected()
+                first = False
+            for message in decode_messages(body):
+                recorder.record(message, now)
+            if interval:
+                await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+async def publisher(host, port, messages, rate, payload_size, recorder):
+    reader, writer = await asyncio.open_connection(host, port)
+    padding = b"x" * max(0, payload_size - STAMP.size)
+    interval = 1.0 / rate if rate else 0
+    try:
+        for seq in range(messages):
+            sent = time.monotonic_ns()
+            if recorder.first_sent is None:
+                recorder.first_sent = sent
+            await http_request(reader, writer, "POST", "/publish?topic=%s" % TOPIC, STAMP.pack(sent, seq) + padding)
+            if interval:
+                await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_technique(technique, clients, messages, host, port, rate=100.0, payload_size=64, poll_interval=0.5,
+                        connect_concurrency=500, timeout=60.0):
+    recorder = Recorder()
+    await wait_for_port(host, port)
+    rss_before = (await fetch_stats(host, port))["rss_bytes"]
+
+    connected_count = 0
+    all_connected = asyncio.Event()
+
+    def connected():
+        nonlocal connected_count
+        connected_count += 1
+        if connected_count == clients:
+            all_connected.set()
+
+    gate = asyncio.Semaphore(connect_concurrency)
+
+    async def start_client(index):
+        async with gate:
+            ready = asyncio.Event()
+
+            def on_connect():
+                connected()
+                ready.set()
+
+            if technique == "websocket":
+                task = asyncio.ensure_future(websocket_client(host, port, index, recorder, on_connect))
+            elif technique == "long_poll":
+                task = asyncio.ensure_future(poll_client(host, port, index, recorder, on_connect, 10, 0))
+            else:
+                task = asyncio.ensure_future(poll_client(host, port, index, recorder, on_connect, 0, poll_interval))
+            done, _ = await asyncio.wait((task, asyncio.ensure_future(ready.wait())),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if task in done:
+                task.result()
+            return task
+
+    connect_start = time.monotonic()
+    tasks = await asyncio.gather(*(start_client(i) for i in range(clients)))
+    await asyncio.wait_for(all_connected.wait(), timeout)
+    connect_time = time.monotonic() - connect_start
+    await asyncio.sleep(0.5)
+    stats = await fetch_stats(host, port)
+
+    expected = clients * messages
+    await publisher(host, port, messages, rate, payload_size, recorder)
+    deadline = time.monotonic() + timeout
+    while recorder.delivered < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = sorted(recorder.latencies)
+    elapsed_ns = (recorder.last_received or 0) - (recorder.first_sent or 0)
+    return {
+        "technique": technique,
+        "clients": clients,
+        "messages": messages,
+        "expected": expected,
+        "delivered": recorder.delivered,
+        "connect_time_s": connect_time,
+        "throughput_msgs_per_s": recorder.delivered / (elapsed_ns / 1e9) if elapsed_ns > 0 else None,
+        "p50_ms": percentile(latencies, 0.50) / 1e6 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) / 1e6 if latencies else None,
+        "max_ms": latencies[-1] / 1e6 if latencies else None,
+        "memory_per_connection_bytes": (stats["rss_bytes"] - rss_before) / clients,
+        "gateway_subscriptions": stats["subscriptions"],
+    }
+
+
+def benchmark(technique, clients, messages, host="127.0.0.1", port=8765, **options):
+    """Start a fresh gateway process, run one technique against it and return the result record."""
+    process = multiprocessing.Process(target=_serve, args=(host, port, max(1024, messages)), daemon=True)
+    process.start()
+    try:
+        return asyncio.run(run_technique(technique, clients, messages, host, port, **options))
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the gateway with simulated clients.")
+    parser.add_argument("--techniques", nargs="+", choices=TECHNIQUES, default=list(TECHNIQUES))
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=10.0, help="published messages per second")
+    parser.add_argument("--payload-size", type=int, default=64)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between plain polls")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", default="-", help="output JSON file, '-' for stdout")
+    args = parser.parse_args(argv)
+    _raise_fd_limit()
+
+    results = []
+    for technique in args.techniques:
+        result = benchmark(technique, args.clients, args.messages, args.host, args.port, rate=args.rate,
+                           payload_size=args.payload_size, poll_interval=args.poll_interval, timeout=args.timeout)
+        results.append(result)
+        print("%-10s delivered %d/%d  %.0f msg/s  p50 %.2f ms  p99 %.2f ms  %.0f B/conn" % (
+            technique, result["delivered"], result["expected"], result["throughput_msgs_per_s"] or 0,
+            result["p50_ms"] or 0, result["p99_ms"] or 0, result["memory_per_connection_bytes"]), file=sys.stderr)
+
+    report = {"meta": {"python": sys.version.split()[0], "cpus": os.cpu_count(), "created":
+                       time.strftime("%Y-%m-%dT%H:%M:%S%z")}, "results": results}
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
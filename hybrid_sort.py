@@ -0,0 +1,270 @@
+"""
+Hybrid Sort (Timsort-style)
+
+Overview:
+    - optimized_bubble_sort in case2.py is O(n^2) and becomes unusable past a few thousand elements.
+    - hybrid_sort keeps its best-case behavior (already sorted input is detected in a single O(n) pass, the same
+      guarantee the `swapped` flag gives) while bringing the worst case down to O(n log n).
+
+How it works:
+    1. Natural runs: the array is scanned for runs that are already ascending (or strictly descending, which are
+       reversed in place). Sorted input is one run, so nothing else happens.
+    2. Short runs are extended to `minrun` elements with binary insertion sort, which is fast on small slices.
+    3. Runs are pushed on a stack and merged while keeping the Timsort invariants, so merges stay balanced.
+    4. Merges gallop: once one run "wins" MIN_GALLOP times in a row, the merge switches to exponential search and
+       moves whole blocks at once, which makes merging partially ordered data close to linear.
+
+Usage:
+    hybrid_sort(arr)                                         # in place, like optimized_bubble_sort
+    hybrid_sort(messages, key=lambda m: m["timestamp"], reverse=True)
+
+The sort is stable, also with reverse=True (equal keys keep their original order).
+"""
+
+from bisect import bisect_left, bisect_right
+
+import instrumentation
+
+
+MIN_MERGE = 32
+MIN_GALLOP = 7
+
+
+def compute_minrun(n):
+    """Return the minimum run length for an array of n elements (between MIN_MERGE/2 and MIN_MERGE)."""
+    r = 0
+    while n >= MIN_MERGE:
+        r |= n & 1
+        n >>= 1
+    return n + r
+
+
+def gallop_left(key, a, lo, hi):
+    """Leftmost position in a[lo:hi] where key could be inserted, found by exponential then binary search."""
+    offset = 1
+    while lo + offset < hi and a[lo + offset - 1] < key:
+        offset = (offset << 1) + 1
+    return bisect_left(a, key, lo + (offset >> 1), min(lo + offset, hi))
+
+
+def gallop_right(key, a, lo, hi):
+    """Rightmost position in a[lo:hi] where key could be inserted, found by exponential then binary search."""
+    offset = 1
+    while lo + offset < hi and not key < a[lo + offset - 1]:
+        offset = (offset << 1) + 1
+    return bisect_right(a, key, lo + (offset >> 1), min(lo + offset, hi))
+
+
+class _HybridSorter:
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+        self.min_gallop = MIN_GALLOP
+        self.runs = []
+
+    def _reverse(self, lo, hi):
+        self.keys[lo:hi] = self.keys[lo:hi][::-1]
+        if self.values is not None:
+            self.values[lo:hi] = self.values[lo:hi][::-1]
+
+    def count_run(self, lo, hi):
+        # Same idea as the `swapped` flag: a single pass tells us how much of the input is already in order.
+        keys = self.keys
+        run_hi = lo + 1
+        if run_hi == hi:
+            return 1
+        if keys[run_hi] < keys[lo]:
+            run_hi += 1
+            while run_hi < hi and keys[run_hi] < keys[run_hi - 1]:
+                run_hi += 1
+            self._reverse(lo, run_hi)
+        else:
+            run_hi += 1
+            while run_hi < hi and not keys[run_hi] < keys[run_hi - 1]:
+                run_hi += 1
+        return run_hi - lo
+
+    def binary_insertion_sort(self, lo, hi, start):
+        keys, values = self.keys, self.values
+        for i in range(start, hi):
+            pivot = keys[i]
+            pos = bisect_right(keys, pivot, lo, i)
+            if pos == i:
+                continue
+            keys[pos + 1:i + 1] = keys[pos:i]
+            keys[pos] = pivot
+            if values is not None:
+                item = values[i]
+                values[pos + 1:i + 1] = values[pos:i]
+                values[pos] = item
+
+    def merge_collapse(self):
+        runs = self.runs
+        while len(runs) > 1:
+            n = len(runs) - 2
+            if (n > 0 and runs[n - 1][1] <= runs[n][1] + runs[n + 1][1]) or \
+                    (n > 1 and runs[n - 2][1] <= runs[n - 1][1] + runs[n][1]):
+                if runs[n - 1][1] < runs[n + 1][1]:
+                    n -= 1
+            elif runs[n][1] > runs[n + 1][1]:
+                break
+            self.merge_at(n)
+
+    def merge_force_collapse(self):
+        runs = self.runs
+        while len(runs) > 1:
+            n = len(runs) - 2
+            if n > 0 and runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+            self.merge_at(n)
+
+    def merge_at(self, i):
+        keys = self.keys
+        base_a, len_a = self.runs[i]
+        base_b, len_b = self.runs[i + 1]
+        self.runs[i] = (base_a, len_a + len_b)
+        del self.runs[i + 1]
+
+        # Elements of A already below B[0] and elements of B already above A[-1] are in place.
+        start = gallop_right(keys[base_b], keys, base_a, base_a + len_a)
+        if start == base_a + len_a:
+            return
+        end = gallop_left(keys[base_b - 1], keys, base_b, base_b + len_b)
+        if end == base_b:
+            return
+        self.merge_lo(start, base_b, end)
+
+    def merge_lo(self, lo, mid, hi):
+        keys, values = self.keys, self.values
+        left_keys = keys[lo:mid]
+        left_values = values[lo:mid] if values is not None else None
+        na = mid - lo
+        i, j, dest = 0, mid, lo
+        min_gallop = self.min_gallop
+
+        while i < na and j < hi:
+            count_a = count_b = 0
+            # One element at a time until one side keeps winning.
+            while i < na and j < hi:
+                if keys[j] < left_keys[i]:
+                    keys[dest] = keys[j]
+                    if values is not None:
+                        values[dest] = values[j]
+                    j += 1
+                    count_b += 1
+                    count_a = 0
+                else:
+                    keys[dest] = left_keys[i]
+                    if values is not None:
+                        values[dest] = left_values[i]
+                    i += 1
+                    count_a += 1
+                    count_b = 0
+                dest += 1
+                if count_a >= min_gallop or count_b >= min_gallop:
+                    break
+
+            # Galloping mode: move whole blocks while it keeps paying off.
+            while i < na and j < hi:
+                k = gallop_right(keys[j], left_keys, i, na)
+                count_a = k - i
+                if count_a:
+                    keys[dest:dest + count_a] = left_keys[i:k]
+                    if values is not None:
+                        values[dest:dest + count_a] = left_values[i:k]
+                    dest += count_a
+                    i = k
+                    if i == na:
+                        break
+                keys[dest] = keys[j]
+                if values is not None:
+                    values[dest] = values[j]
+                dest += 1
+                j += 1
+                if j == hi:
+                    break
+
+                k = gallop_left(left_keys[i], keys, j, hi)
+                count_b = k - j
+                if count_b:
+                    keys[dest:dest + count_b] = keys[j:k]
+                    if values is not None:
+                        values[dest:dest + count_b] = values[j:k]
+                    dest += count_b
+                    j = k
+                    if j == hi:
+                        break
+                keys[dest] = left_keys[i]
+                if values is not None:
+                    values[dest] = left_values[i]
+                dest += 1
+                i += 1
+                if i == na:
+                    break
+
+                if count_a < MIN_GALLOP and count_b < MIN_GALLOP:
+                    min_gallop += 1
+                    break
+                min_gallop = max(1, min_gallop - 1)
+
+        if i < na:
+            keys[dest:dest + na - i] = left_keys[i:]
+            if values is not None:
+                values[dest:dest + na - i] = left_values[i:]
+        self.min_gallop = max(1, min_gallop)
+
+    def sort(self):
+        n = len(self.keys)
+        if n < 2:
+            return
+        minrun = compute_minrun(n)
+        lo = 0
+        while lo < n:
+            run_len = self.count_run(lo, n)
+            if run_len < minrun:
+                forced = min(minrun, n - lo)
+                self.binary_insertion_sort(lo, lo + forced, lo + run_len)
+                run_len = forced
+            self.runs.append((lo, run_len))
+            self.merge_collapse()
+            lo += run_len
+        self.merge_force_collapse()
+
+
+def hybrid_sort(arr, key=None, reverse=False):
+    """Sort arr in place (stable). Best case O(n) for sorted or reversed input, worst case O(n log n)."""
+    started = instrumentation.start("sort.hybrid_sort") if instrumentation.enabled else 0
+    try:
+        _hybrid_sort(arr, key, reverse)
+    finally:
+        if started:
+            instrumentation.stop("sort.hybrid_sort", started)
+
+
+def _hybrid_sort(arr, key, reverse):
+    if len(arr) < 2:
+        return
+    items = arr if isinstance(arr, list) else list(arr)
+    if reverse:
+        items.reverse()
+    if key is None:
+        _HybridSorter(items, None).sort()
+    else:
+        _HybridSorter([key(item) for item in items], items).sort()
+    if reverse:
+        items.reverse()
+    if items is not arr:
+        for i, item in enumerate(items):
+            arr[i] = item
+
+
+def hybrid_sorted(iterable, key=None, reverse=False):
+    """Return a new sorted list, leaving the input untouched."""
+    started = instrumentation.start("sort.hybrid_sorted") if instrumentation.enabled else 0
+    try:
+        items = list(iterable)
+        _hybrid_sort(items, key, reverse)
+        return items
+    finally:
+        if started:
+            instrumentation.stop("sort.hybrid_sorted", started)
@@ -0,0 +1,330 @@
+"""
+Streaming Bulk Import
+
+Overview:
+    - The algorithms in case2.py and the storage options in case1.py assume the whole dataset sits in one list. The
+      nightly bulk import (tens of millions of messages) used to load everything eagerly before doing any work.
+    - This pipeline is a chain of generators, so only a bounded number of messages is in memory at any time:
+
+          read_lines -> parse (JSON lines -> Message) -> filter -> sort/merge by timestamp -> batches -> insert
+
+    - A reader thread reads and decompresses lines into chunks, a thread pool parses the chunks, and the calling
+      thread sorts and inserts the results. Every hand-off is a bounded buffer (prefetch chunks), so file I/O and
+      parsing overlap with index building without reading ahead of it. Output order is the input order.
+    - Sorting uses external_sort.py (sorted runs spilled to disk, then a k-way merge) and keeps memory within
+      memory_budget. Inputs that are each sorted already can be combined with merge_by_timestamp (heapq.merge)
+      without spilling. The sort's worker processes start with forkserver (or spawn), never fork, because the
+      reader and parser threads are already running by then.
+    - The CLI writes into a MessageLog, which rejects timestamps that go backwards, so it sorts by default.
+      --merge or --no-sort skip the external sort for input that is already in order.
+
+Input format: one JSON object per line with message_id, conversation_id, sender_id, timestamp and body (text).
+Files ending in .gz are decompressed on the fly.
+
+Usage:
+    with MessageLog("data/log") as log:
+        stats = import_messages(["day1.jsonl.gz", "day2.jsonl.gz"], [log], sort=True,
+                                progress=lambda s: print(s["inserted"], s["rate"]))
+
+    python import_pipeline.py day1.jsonl day2.jsonl --log-dir data/log
+"""
+
+import argparse
+import gzip
+import heapq
+import itertools
+import json
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from external_sort import DEFAULT_MEMORY_BUDGET, external_sort
+from message_log import MessageLog
+from message_record import Message
+from message_store import MessageStore
+from search_index import SearchIndex
+
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_CHUNK_LINES = 5000
+DEFAULT_PREFETCH = 4
+FIELDS = ("message_id", "conversation_id", "sender_id", "timestamp", "body")
+
+
+def timestamp_key(message):
+    return message.timestamp, message.message_id
+
+
+# -- stages -------------------------------------------------------------------------------------------------------------
+
+def read_lines(paths):
+    """Yield the non-empty lines of every file in paths, in order."""
+    for path in paths:
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def parse_line(line):
+    record = json.loads(line)
+    return Message(*(record[field] for field in FIELDS))
+
+
+def parse_lines(lines, errors="raise"):
+    """Parse a list of JSON lines into Messages. errors="skip" drops malformed lines instead of raising."""
+    messages = []
+    for line in lines:
+        try:
+            messages.append(parse_line(line))
+        except (ValueError, KeyError, TypeError):
+            if errors != "skip":
+                raise
+    return messages
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parallel_map(func, chunks, executor, prefetch=DEFAULT_PREFETCH):
+    """Like map(func, chunks) on executor, in order, with at most `prefetch` chunks submitted ahead."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(func, chunk))
+        if len(pending) >= prefetch:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def background(iterable, depth=DEFAULT_PREFETCH):
+    """Advance iterable on its own thread, keeping up to `depth` items ready ahead of the consumer."""
+    buffer = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+        except BaseException as exc:
+            put((False, exc))
+        else:
+            put((False, None))
+
+    thread = threading.Thread(target=produce, name="import-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = buffer.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def filter_messages(messages, predicate=None, since=None, until=None):
+    """Keep messages with since <= timestamp < until (either bound optional) that pass predicate."""
+    for message in messages:
+        if since is not None and message.timestamp < since:
+            continue
+        if until is not None and message.timestamp >= until:
+            continue
+        if predicate is not None and not predicate(message):
+            continue
+        yield message
+
+
+def process_context():
+    """
+    Multiprocessing context for the sort workers. The pipeline's reader and parser threads are running when the
+    pool starts, and forking a multi-threaded process can deadlock the child, so use forkserver (or spawn).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def sort_by_timestamp(messages, memory_budget=DEFAULT_MEMORY_BUDGET, workers=None, tmp_dir=None, mp_context=None):
+    return external_sort(messages, key=timestamp_key, memory_budget=memory_budget, workers=workers, tmp_dir=tmp_dir,
+                         mp_context=mp_context or process_context())
+
+
+def merge_by_timestamp(*streams):
+    """Merge streams that are each sorted by timestamp already."""
+    return heapq.merge(*streams, key=timestamp_key)
+
+
+# -- sinks --------------------------------------------------------------------------------------------------------------
+
+def store_sink(target):
+    """Return a function inserting a batch of Messages into a MessageLog, MessageStore, SearchIndex or ShardedStore."""
+    if isinstance(target, MessageLog):
+        return target.append_many
+    if isinstance(target, MessageStore):
+        return lambda batch: target.add_many((m.message_id, m.timestamp, m) for m in batch)
+    if isinstance(target, SearchIndex):
+        def index(batch):
+            for message in batch:
+                target.add_message(message)
+        return index
+    if hasattr(target, "add_many"):
+        # ShardedStore, keyed by conversation
+        return lambda batch: target.add_many([(m.conversation_id, m) for m in batch])
+    if callable(target):
+        return target
+    raise TypeError("cannot insert messages into %r" % (target,))
+
+
+# -- progress -----------------------------------------------------------------------------------------------------------
+
+class Progress:
+    def __init__(self, callback=None, interval=1.0, clock=time.monotonic):
+        self.callback = callback
+        self.interval = interval
+        self._clock = clock
+        self.started = clock()
+        self._last_report = self.started
+        self.read = 0
+        self.parsed = 0
+        self.inserted = 0
+        self.batches = 0
+
+    def snapshot(self):
+        elapsed = self._clock() - self.started
+        return {
+            "read": self.read,
+            "parsed": self.parsed,
+            "inserted": self.inserted,
+            "batches": self.batches,
+            "elapsed_s": elapsed,
+            "rate": self.inserted / elapsed if elapsed > 0 else None,
+        }
+
+    def batch_done(self, size):
+        self.inserted += size
+        self.batches += 1
+        now = self._clock()
+        if self.callback is not None and now - self._last_report >= self.interval:
+            self._last_report = now
+            self.callback(self.snapshot())
+
+    def finish(self):
+        stats = self.snapshot()
+        if self.callback is not None:
+            self.callback(stats)
+        return stats
+
+
+# -- pipeline -----------------------------------------------------------------------------------------------------------
+
+def iter_messages(paths, executor, chunk_lines=DEFAULT_CHUNK_LINES, prefetch=DEFAULT_PREFETCH, errors="raise",
+                  progress=None):
+    """Read and parse every file on executor, yielding Messages in file order."""
+    def counted(lines):
+        for chunk in chunked(lines, chunk_lines):
+            if progress is not None:
+                progress.read += len(chunk)
+            yield chunk
+
+    def parse(chunk):
+        return parse_lines(chunk, errors)
+
+    # Reading (and decompression) runs on a reader thread, parsing on the pool, and the caller inserts.
+    chunks = background(counted(read_lines(paths)), prefetch)
+    for messages in parallel_map(parse, chunks, executor, prefetch):
+        if progress is not None:
+            progress.parsed += len(messages)
+        yield from messages
+
+
+def import_messages(paths, targets, sort=False, merge=False, predicate=None, since=None, until=None,
+                    batch_size=DEFAULT_BATCH_SIZE, chunk_lines=DEFAULT_CHUNK_LINES, prefetch=DEFAULT_PREFETCH,
+                    threads=None, memory_budget=DEFAULT_MEMORY_BUDGET, errors="raise", progress=None,
+                    progress_interval=1.0):
+    """
+    Import JSON-lines files into every target (see store_sink) in batches of batch_size.
+
+    sort=True orders all messages by timestamp with an external sort; merge=True assumes every file is sorted
+    already and k-way merges them instead. progress(stats) is called about every progress_interval seconds and once
+    at the end; the final stats are also returned.
+    """
+    if sort and merge:
+        raise ValueError("use either sort or merge, not both")
+    sinks = [store_sink(target) for target in targets]
+    tracker = Progress(progress, progress_interval)
+    threads = threads or min(8, max(2, prefetch))
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="import") as executor:
+        if merge:
+            streams = [iter_messages([path], executor, chunk_lines, prefetch, errors, tracker) for path in paths]
+            messages = merge_by_timestamp(*(filter_messages(s, predicate, since, until) for s in streams))
+        else:
+            messages = filter_messages(iter_messages(paths, executor, chunk_lines, prefetch, errors, tracker),
+                                       predicate, since, until)
+            if sort:
+                messages = sort_by_timestamp(messages, memory_budget)
+        for batch in chunked(messages, batch_size):
+            for sink in sinks:
+                sink(batch)
+            tracker.batch_done(len(batch))
+    return tracker.finish()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream JSON-lines message files into a MessageLog.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--log-dir", required=True)
+    # A MessageLog rejects timestamps that go backwards, so the CLI sorts unless told the input is in order.
+    parser.add_argument("--sort", action="store_true", default=True,
+                        help="sort all messages by timestamp with an external sort (the default)")
+    parser.add_argument("--no-sort", dest="sort", action="store_false",
+                        help="insert in file order; the files must already be in timestamp order")
+    parser.add_argument("--merge", action="store_true", help="k-way merge files that are each sorted already")
+    parser.add_argument("--since", type=float)
+    parser.add_argument("--until", type=float)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET)
+    parser.add_argument("--skip-errors", action="store_true", help="drop malformed lines instead of stopping")
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print("read %d  parsed %d  inserted %d  %.0f msg/s" % (
+            stats["read"], stats["parsed"], stats["inserted"], stats["rate"] or 0), file=sys.stderr)
+
+    with MessageLog(args.log_dir) as log:
+        stats = import_messages(args.paths, [log], sort=args.sort and not args.merge, merge=args.merge,
+                                since=args.since, until=args.until, batch_size=args.batch_size, threads=args.threads,
+                                memory_budget=args.memory_budget,
+                                errors="skip" if args.skip_errors else "raise", progress=report)
+    json.dump(stats, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Runtime Instrumentation
+
+Overview:
+    - None of the structures discussed in case1.py and case2.py can be observed while they run. This module records
+      latency histograms and counters for the hot paths and can sample stacks, then exports everything as JSON.
+    - Instrumented hot paths (metric names): store.insert / store.lookup (MessageStore.add/get), queue.push /
+      queue.pop / queue.pop_batch (DispatchQueue), broker.publish plus the broker.deliveries counter, and
+      sort.hybrid_sort / sort.hybrid_sorted / sort.numeric_sort / sort.external_sort. The histogram of each name
+      holds the timed (sampled) calls; its entry in "counters" estimates the total number of calls.
+
+Overhead:
+    - The hooks sit inside the hot functions behind `if instrumentation.enabled`, so they fire no matter how the
+      function was imported. Disabled (the default), a hook costs one module attribute lookup and a branch.
+    - Enabled, calls are sampled: only every sample_every-th call per thread (16 by default) is timed. The others
+      cost one call into start() that decrements a per-thread countdown. A sampled call adds two perf_counter_ns()
+      calls and a histogram update, and adds sample_every to the counter, so counts are exact only with
+      enable(sample_every=1), which also times every call.
+    - Measured on the test VM with MessageStore add/get and DispatchQueue push/pop (80k operations, 4.5-6.5 us per
+      operation, best of 20-25 interleaved runs, repeated in five sessions; run-to-run noise is about +/-10%):
+      disabled is within that noise of a copy with the hooks removed. The default sample_every=16 costs 0-10% over
+      disabled. Timing every call costs 18-48%, typically 25-30%. The cost per call is fixed, so operations doing
+      more work (sorts, pop_batch, fan-out) see less.
+
+Histograms:
+    - HDR-style log-linear buckets over nanoseconds: exact below 32 ns, then 16 buckets per power of two, so every
+      recorded value is within ~6% of its bucket. Counts live in one preallocated list per histogram; only the sum is
+      exact, min/max/percentiles are bucket bounds.
+    - Each thread records into its own histograms and counters (threading.local), so recording takes no locks.
+      snapshot() merges the per-thread data; a snapshot taken during heavy recording may miss in-progress updates.
+
+Usage:
+    instrumentation.enable()
+    with instrumentation.timer("import.batch"):
+        ...
+    instrumentation.start_profiler(interval=0.005)
+    ...
+    print(instrumentation.export_json())
+"""
+
+import collections
+import json
+import sys
+import threading
+import time
+
+
+SUB_BUCKET_BITS = 5
+MAX_VALUE_BITS = 48     # ~78 hours in nanoseconds; longer values are clamped
+_EXACT = 1 << SUB_BUCKET_BITS
+PERCENTILES = (50, 90, 99, 99.9)
+
+def bucket_index(value):
+    if value < _EXACT:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+
+def bucket_lower_bound(index):
+    if index < _EXACT:
+        return index
+    shift = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    return (index - (shift << (SUB_BUCKET_BITS - 1))) << shift
+
+
+_BUCKETS = bucket_index((1 << MAX_VALUE_BITS) - 1) + 1
+
+
+class Histogram:
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.total = 0
+
+    def record(self, value):
+        if value >> MAX_VALUE_BITS:
+            value = (1 << MAX_VALUE_BITS) - 1
+        if value < _EXACT:
+            self.counts[value if value > 0 else 0] += 1
+        else:
+            shift = value.bit_length() - SUB_BUCKET_BITS
+            self.counts[(shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)] += 1
+        self.total += value
+
+    def merge(self, other):
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.total += other.total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, percent):
+        """Lower bound of the bucket holding the given percentile."""
+        total = self.count
+        if not total:
+            return None
+        target = max(1, -(-total * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return bucket_lower_bound(index)
+
+    def summary(self):
+        total = self.count
+        used = [index for index, count in enumerate(self.counts) if count]
+        result = {"count": total,
+                  "min_ns": bucket_lower_bound(used[0]) if used else None,
+                  "max_ns": bucket_lower_bound(used[-1] + 1) - 1 if used else None,
+                  "mean_ns": self.total / total if total else None}
+        for percent in PERCENTILES:
+            result["p%s_ns" % ("%g" % percent).replace(".", "_")] = self.percentile(percent)
+        return result
+
+
+# -- per-thread recording ----------------------------------------------------------------------------------------------
+
+_local = threading.local()
+_registry = []
+_registry_lock = threading.Lock()
+enabled = False
+DEFAULT_SAMPLE_EVERY = 16
+_sample_every = DEFAULT_SAMPLE_EVERY
+
+
+def _thread_data():
+    try:
+        return _local.data
+    except AttributeError:
+        data = _local.data = ({}, {})
+        with _registry_lock:
+            _registry.append(data)
+        return data
+
+
+def _histogram(name):
+    histograms = _thread_data()[0]
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram()
+    return histogram
+
+
+def record(name, nanoseconds):
+    try:
+        histogram = _local.data[0][name]
+    except (AttributeError, KeyError):
+        histogram = _histogram(name)
+    histogram.record(nanoseconds)
+
+
+def count(name, amount=1):
+    try:
+        counters = _local.data[1]
+    except AttributeError:
+        counters = _thread_data()[1]
+    counters[name] = counters.get(name, 0) + amount
+
+
+class timer:
+    """Context manager recording the elapsed time of its block under `name` (a no-op while disabled)."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns() if enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, time.perf_counter_ns() - self.start)
+
+
+def start(name):
+    """
+    Return the start time of a sampled call of the hot path `name`, or 0 for the others. Hot paths call it only
+    behind `if instrumentation.enabled`, and pass a non-zero result to stop().
+
+    Unsampled calls only decrement a per-thread countdown. A sampled call stands for the sample_every calls since the
+    previous one, so it adds sample_every to the counter of `name`.
+    """
+    local = _local
+    try:
+        countdown = local.countdown - 1
+    except AttributeError:
+        countdown = 0
+    if countdown > 0:
+        local.countdown = countdown
+        return 0
+    every = local.countdown = _sample_every
+    try:
+        counters = local.data[1]
+    except AttributeError:
+        counters = _thread_data()[1]
+    counters[name] = counters.get(name, 0) + every
+    return time.perf_counter_ns()
+
+
+def stop(name, started):
+    record(name, time.perf_counter_ns() - started)
+
+
+def enable(sample_every=DEFAULT_SAMPLE_EVERY):
+    """Start recording, timing every n-th hot-path call per thread (sample_every=1 times and counts every call)."""
+    global enabled, _sample_every
+    if sample_every < 1:
+        raise ValueError("sample_every must be at least 1")
+    _sample_every = sample_every
+    enabled = True
+
+
+def disable():
+    """Stop recording. Recorded data is kept until reset()."""
+    global enabled
+    enabled = False
+
+
+def is_enabled():
+    return enabled
+
+
+def reset():
+    with _registry_lock:
+        for histograms, counters in _registry:
+            histograms.clear()
+            counters.clear()
+    if _profiler is not None:
+        _profiler.reset()
+
+
+# -- sampling profiler -------------------------------------------------------------------------------------------------
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads every `interval` seconds with sys._current_frames()."""
+
+    def __init__(self, interval=0.005, max_depth=32):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.functions = collections.Counter()
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def reset(self):
+        self.samples = 0
+        self.functions.clear()
+        self.stacks.clear()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    self._sample(frame)
+
+    def _sample(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append("%s:%s:%d" % (code.co_filename, code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        if not stack:
+            return
+        self.samples += 1
+        self.functions[stack[0]] += 1
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def summary(self, top=20):
+        """Hottest leaf locations and collapsed stacks (flame-graph input format: "a;b;c": count)."""
+        return {
+            "running": self.running,
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "top_functions": [{"location": location, "samples": samples}
+                              for location, samples in self.functions.most_common(top)],
+            "stacks": dict(self.stacks.most_common(top)),
+        }
+
+
+_profiler = None
+
+
+def start_profiler(interval=0.005):
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(interval)
+    _profiler.interval = interval
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiler():
+    if _profiler is not None:
+        _profiler.stop()
+
+
+# -- snapshot and export -----------------------------------------------------------------------------------------------
+
+def snapshot():
+    histograms, counters = {}, collections.Counter()
+    with _registry_lock:
+        registry = list(_registry)
+    for thread_histograms, thread_counters in registry:
+        for name, histogram in list(thread_histograms.items()):
+            histograms.setdefault(name, Histogram()).merge(histogram)
+        counters.update(dict(thread_counters))
+    return {
+        "enabled": enabled,
+        "sample_every": _sample_every,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "histograms": {name: histograms[name].summary() for name in sorted(histograms)},
+        "counters": dict(sorted(counters.items())),
+        "profile": _profiler.summary() if _profiler is not None else None,
+    }
+
+
+def export_json(path=None, indent=2):
+    """Return the snapshot as JSON, and write it to path if one is given."""
+    text = json.dumps(snapshot(), indent=indent)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
@@ -0,0 +1,235 @@
+"""
+Message Cache
+
+Overview:
+    - case1.py (Task 1) favors hash tables for O(1) lookups, but that does not help when a hot conversation has to be
+      loaded from slower storage (a MessageLog on disk, another shard) on every request. MessageCache sits in front of
+      such a loader and keeps recently used results in memory.
+    - Entries are keyed by (conversation_id, cursor): cursor None stands for the conversation itself (or its newest
+      page), any other cursor for one page of its messages.
+
+Behaviour:
+    - LRU eviction bounded by memory, not entry count: every value is measured once with estimate_size() and the
+      least recently used entries are evicted until the total fits in max_bytes.
+    - Optional TTL: entries older than ttl seconds count as misses and are reloaded.
+    - get_many(keys) answers hits from memory and loads all misses together (with load_many if one is given).
+    - Request coalescing: concurrent misses for the same key wait on a single in-flight load instead of each calling
+      the loader.
+    - Invalidation: on_message(conversation_id, message) drops every cached entry of that conversation. Register it
+      as a write hook (ShardedStore.add_listener(cache.on_message)) so new messages never serve stale pages. A load
+      that is in flight while its key is invalidated is returned to its callers but not cached.
+    - Counters: hits, misses, evictions, expirations, loads and coalesced (misses that joined an in-flight load).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from message_record import estimate_size
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires")
+
+    def __init__(self, value, size, expires):
+        self.value = value
+        self.size = size
+        self.expires = expires
+
+
+class MessageCache:
+    def __init__(self, loader, max_bytes=DEFAULT_MAX_BYTES, ttl=None, load_many=None, sizeof=estimate_size,
+                 clock=time.monotonic):
+        """
+        loader(conversation_id, cursor) returns the value for one key; load_many(keys), if given, returns a
+        {key: value} dict for several keys at once.
+        """
+        self._loader = loader
+        self._load_many = load_many
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._cursors = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    # -- internal bookkeeping (callers hold the lock) ----------------------------------------------------------------
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires is not None and entry.expires <= self._clock():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        conversation_id, cursor = key
+        cursors = self._cursors[conversation_id]
+        cursors.discard(cursor)
+        if not cursors:
+            del self._cursors[conversation_id]
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self._drop(key)
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = _Entry(value, size, expires)
+        self._cursors.setdefault(key[0], set()).add(key[1])
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _claim(self, keys):
+        """Split missed keys into ones this caller loads (new futures) and ones already in flight."""
+        owned, waiting = {}, {}
+        for key in keys:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = Future()
+                owned[key] = future
+                self.loads += 1
+            else:
+                waiting[key] = future
+                self.coalesced += 1
+        return owned, waiting
+
+    def _finish(self, owned, values=None, error=None):
+        with self._lock:
+            for key, future in owned.items():
+                # An invalidation during the load removed (or replaced) our future: hand out the value, don't cache.
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                    if error is None:
+                        self._store(key, values[key])
+        for key, future in owned.items():
+            if error is None:
+                future.set_result(values[key])
+            else:
+                future.set_exception(error)
+
+    def _load(self, owned):
+        keys = list(owned)
+        try:
+            if self._load_many is not None and len(keys) > 1:
+                values = self._load_many(keys)
+                missing = [key for key in keys if key not in values]
+                if missing:
+                    raise KeyError("load_many returned no value for %r" % (missing,))
+            else:
+                values = {key: self._loader(*key) for key in keys}
+        except BaseException as exc:
+            self._finish(owned, error=exc)
+            raise
+        self._finish(owned, values)
+        return values
+
+    # -- lookups -----------------------------------------------------------------------------------------------------
+
+    def get(self, conversation_id, cursor=None):
+        key = (conversation_id, cursor)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+            owned, waiting = self._claim((key,))
+        if waiting:
+            return waiting[key].result()
+        return self._load(owned)[key]
+
+    def get_many(self, keys):
+        """{(conversation_id, cursor): value} for every key, loading all misses in one go."""
+        result = {}
+        missed = {}
+        with self._lock:
+            for key in keys:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    result[key] = entry.value
+                elif key not in missed:
+                    self.misses += 1
+                    missed[key] = None
+            owned, waiting = self._claim(missed)
+        if owned:
+            result.update((key, value) for key, value in self._load(owned).items() if key in owned)
+        for key, future in waiting.items():
+            result[key] = future.result()
+        return result
+
+    def put(self, conversation_id, cursor, value):
+        with self._lock:
+            self._store((conversation_id, cursor), value)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -- invalidation ------------------------------------------------------------------------------------------------
+
+    def invalidate(self, conversation_id, cursor=None):
+        key = (conversation_id, cursor)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._inflight.pop(key, None)
+
+    def invalidate_conversation(self, conversation_id):
+        with self._lock:
+            for cursor in list(self._cursors.get(conversation_id, ())):
+                self._drop((conversation_id, cursor))
+            for key in [k for k in self._inflight if k[0] == conversation_id]:
+                del self._inflight[key]
+
+    def on_message(self, conversation_id, message=None):
+        """Write hook: a new message changes the conversation and all of its pages."""
+        self.invalidate_conversation(conversation_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cursors.clear()
+            self._inflight.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+        }
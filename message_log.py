@@ -0,0 +1,454 @@
+"""
+Memory-Mapped Message Log
+
+Overview:
+    - The structures in case1.py (Task 1) only live in memory, so every restart rebuilds the store from scratch.
+      MessageLog keeps messages on disk in an append-only log that is memory-mapped instead of parsed at startup.
+    - Messages are appended as length-prefixed records to segment files. When the active segment reaches
+      `segment_bytes` it is sealed and a new one is started (segment rolling).
+
+Files in the log directory (N is the segment number, zero padded):
+    - N.log:       records, each <length u32, crc32 u32, timestamp f64, message_id i64, conversation_id i64,
+                   sender_id i64> followed by the body bytes. `length` covers the whole record.
+    - N.tidx:      sparse time index for a sealed segment, one <timestamp f64, position u64> entry at least every
+                   `index_interval` bytes.
+    - N.ids:       id index for a sealed segment, <message_id i64, position u64> entries sorted by id.
+    - tombstones:  ids of deleted messages, <message_id i64> each.
+
+Startup only maps the sealed segments and their index files. Index files are written to a temp file, fsynced and
+renamed into place, so they are either complete or missing; missing ones, or ones that fail a size and bounds check,
+are rebuilt from the segment. The active segment (at most segment_bytes) is scanned to rebuild its in-memory
+indexes; a torn record at its tail (bad length or crc) is truncated away.
+
+Reads:
+    - get(message_id):   binary search in each segment's .ids file (newest first), then one record read.
+    - range(start, end): binary search over segments and their .tidx files, then a sequential scan of only the
+                         records in the window. Timestamps must therefore be appended in non-decreasing order.
+
+Durability: appends are fsynced in batches, after `sync_every` records or `sync_interval` seconds, whichever comes
+first, or explicitly with flush(). delete() only appends a tombstone; compact() rewrites the sealed segments that
+contain deleted messages and drops them for good. Message ids are unique: a deleted id is not reused.
+"""
+
+import mmap
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_left
+
+from message_record import Message
+
+
+RECORD_HEADER = struct.Struct("<IIdqqq")
+INDEX_ENTRY = struct.Struct("<dQ")
+ID_ENTRY = struct.Struct("<qQ")
+TOMBSTONE = struct.Struct("<q")
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_INDEX_INTERVAL = 4096
+DEFAULT_SYNC_EVERY = 256
+DEFAULT_SYNC_INTERVAL = 0.05
+
+
+def _write_atomic(path, chunks):
+    """Write chunks to a temp file, fsync it and rename it over path, so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _encode(message):
+    body = message.body
+    header = RECORD_HEADER.pack(RECORD_HEADER.size + len(body), 0, message.timestamp, message.message_id,
+                                message.conversation_id, message.sender_id)
+    crc = zlib.crc32(body, zlib.crc32(header[8:]))
+    return header[:4] + struct.pack("<I", crc) + header[8:] + body
+
+
+class _Segment:
+    """One segment file. Sealed segments are memory-mapped; the active one is read with pread."""
+
+    def __init__(self, directory, number):
+        self.number = number
+        self.path = os.path.join(directory, "%020d.log" % number)
+        self.tidx_path = self.path[:-4] + ".tidx"
+        self.ids_path = self.path[:-4] + ".ids"
+        self.size = 0
+        self.map = None
+        self.tidx = None
+        self.ids = None
+        # Active segment only: in-memory indexes.
+        self.time_index = []
+        self.id_index = {}
+        self.last_indexed = None
+
+    # -- sealed segments -------------------------------------------------------------------------------------------
+
+    def open_sealed(self):
+        self.size = os.path.getsize(self.path)
+        self.map = self._map(self.path)
+        self.tidx = self._map(self.tidx_path)
+        self.ids = self._map(self.ids_path)
+
+    @staticmethod
+    def _map(path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for name in ("map", "tidx", "ids"):
+            m = getattr(self, name)
+            if isinstance(m, mmap.mmap):
+                m.close()
+            setattr(self, name, None)
+
+    @property
+    def sealed(self):
+        return self.map is not None
+
+    def first_timestamp(self):
+        if self.sealed:
+            return INDEX_ENTRY.unpack_from(self.tidx, 0)[0] if len(self.tidx) else None
+        return self.time_index[0][0] if self.time_index else None
+
+    def write_indexes(self):
+        _write_atomic(self.tidx_path, (INDEX_ENTRY.pack(timestamp, position)
+                                       for timestamp, position in self.time_index))
+        _write_atomic(self.ids_path, (ID_ENTRY.pack(message_id, self.id_index[message_id])
+                                      for message_id in sorted(self.id_index)))
+
+    def indexes_valid(self):
+        """Cheap consistency check of the index files against the segment: whole entries, positions in range."""
+        try:
+            size = os.path.getsize(self.path)
+            tidx_size = os.path.getsize(self.tidx_path)
+            ids_size = os.path.getsize(self.ids_path)
+        except OSError:
+            return False
+        if tidx_size % INDEX_ENTRY.size or ids_size % ID_ENTRY.size:
+            return False
+        if (size == 0) != (ids_size == 0) or (ids_size == 0) != (tidx_size == 0):
+            return False
+        if tidx_size // INDEX_ENTRY.size > ids_size // ID_ENTRY.size:
+            return False
+        if size:
+            with open(self.tidx_path, "rb") as f:
+                f.seek(tidx_size - INDEX_ENTRY.size)
+                last_indexed = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[1]
+            with open(self.ids_path, "rb") as f:
+                first_position = ID_ENTRY.unpack(f.read(ID_ENTRY.size))[1]
+            if last_indexed >= size or first_position >= size:
+                return False
+        return True
+
+    # -- lookups -------------------------------------------------------------------------------------------------
+
+    def find_id(self, message_id):
+        if not self.sealed:
+            return self.id_index.get(message_id)
+        ids = self.ids
+        lo, hi = 0, len(ids) // ID_ENTRY.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, position = ID_ENTRY.unpack_from(ids, mid * ID_ENTRY.size)
+            if found < message_id:
+                lo = mid + 1
+            elif found > message_id:
+                hi = mid
+            else:
+                return position
+        return None
+
+    def seek_time(self, timestamp):
+        """Position of the last sparse index entry strictly before `timestamp` (or the segment start)."""
+        if not self.sealed:
+            i = bisect_left(self.time_index, (timestamp,))
+            return self.time_index[i - 1][1] if i else 0
+        tidx = self.tidx
+        lo, hi = 0, len(tidx) // INDEX_ENTRY.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX_ENTRY.unpack_from(tidx, mid * INDEX_ENTRY.size)[0] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return INDEX_ENTRY.unpack_from(tidx, (lo - 1) * INDEX_ENTRY.size)[1] if lo else 0
+
+    def record_count(self):
+        if self.sealed:
+            return len(self.ids) // ID_ENTRY.size
+        return len(self.id_index)
+
+    def message_ids(self):
+        if not self.sealed:
+            return list(self.id_index)
+        return [ID_ENTRY.unpack_from(self.ids, i)[0] for i in range(0, len(self.ids), ID_ENTRY.size)]
+
+
+class MessageLog:
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, index_interval=DEFAULT_INDEX_INTERVAL,
+                 sync_every=DEFAULT_SYNC_EVERY, sync_interval=DEFAULT_SYNC_INTERVAL):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments = []
+        self._first_timestamps = []
+        self._last_timestamp = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self._tombstone_path = os.path.join(directory, "tombstones")
+        self._tombstones = set()
+        if os.path.exists(self._tombstone_path):
+            with open(self._tombstone_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % TOMBSTONE.size
+            self._tombstones.update(message_id for (message_id,) in TOMBSTONE.iter_unpack(data[:usable]))
+            if usable != len(data):
+                # Drop a torn tombstone so later appends stay aligned to TOMBSTONE.size.
+                os.truncate(self._tombstone_path, usable)
+        self._tombstone_file = open(self._tombstone_path, "ab")
+
+        numbers = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".log"))
+        for number in numbers[:-1]:
+            segment = _Segment(directory, number)
+            if not segment.indexes_valid():
+                # Crashed while sealing or compacting (or the files were damaged): rebuild them from the records.
+                self._recover(segment)
+                segment.write_indexes()
+            segment.open_sealed()
+            self._segments.append(segment)
+        self._open_active(numbers[-1] if numbers else 0)
+        self._refresh_first_timestamps()
+
+    # -- segment management ----------------------------------------------------------------------------------------
+
+    def _open_active(self, number):
+        segment = _Segment(self.directory, number)
+        self._fd = os.open(segment.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._recover(segment)
+        os.ftruncate(self._fd, segment.size)
+        self._active = segment
+        self._segments.append(segment)
+        if segment.time_index:
+            self._last_timestamp = self._scan_last_timestamp(segment)
+        elif len(self._segments) > 1:
+            previous = self._segments[-2]
+            for message in self._scan(previous, previous.seek_time(float("inf"))):
+                self._last_timestamp = message.timestamp
+
+    def _recover(self, segment):
+        """Scan a segment, rebuilding its in-memory indexes and stopping at the first torn record."""
+        segment.time_index, segment.id_index, segment.last_indexed = [], {}, None
+        with open(segment.path, "rb") as f:
+            data = f.read()
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            length, crc, timestamp, message_id, _, _ = RECORD_HEADER.unpack_from(data, position)
+            if length < RECORD_HEADER.size or position + length > len(data):
+                break
+            if zlib.crc32(data[position + RECORD_HEADER.size:position + length],
+                          zlib.crc32(data[position + 8:position + RECORD_HEADER.size])) != crc:
+                break
+            self._index_record(segment, timestamp, message_id, position)
+            position += length
+        segment.size = position
+
+    def _index_record(self, segment, timestamp, message_id, position):
+        if segment.last_indexed is None or position - segment.last_indexed >= self.index_interval:
+            segment.time_index.append((timestamp, position))
+            segment.last_indexed = position
+        segment.id_index[message_id] = position
+
+    def _scan_last_timestamp(self, segment):
+        timestamp = None
+        for message in self._scan(segment, segment.time_index[-1][1]):
+            timestamp = message.timestamp
+        return timestamp
+
+    def _roll(self):
+        self.flush()
+        active = self._active
+        active.write_indexes()
+        os.close(self._fd)
+        active.open_sealed()
+        active.time_index, active.id_index = [], {}
+        self._open_active(active.number + 1)
+        self._refresh_first_timestamps()
+
+    def _refresh_first_timestamps(self):
+        self._first_timestamps = [s.first_timestamp() for s in self._segments if s.first_timestamp() is not None]
+
+    # -- writes ----------------------------------------------------------------------------------------------------
+
+    def append(self, message):
+        """Append a Message. Timestamps must not go backwards."""
+        if self._last_timestamp is not None and message.timestamp < self._last_timestamp:
+            raise ValueError("timestamps must be appended in non-decreasing order")
+        record = _encode(message)
+        if self._active.size and self._active.size + len(record) > self.segment_bytes:
+            self._roll()
+        active = self._active
+        os.write(self._fd, record)
+        first = not active.time_index
+        self._index_record(active, message.timestamp, message.message_id, active.size)
+        active.size += len(record)
+        self._last_timestamp = message.timestamp
+        if first:
+            self._refresh_first_timestamps()
+        self._maybe_sync()
+        return message.message_id
+
+    def append_many(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def delete(self, message_id):
+        """Mark a message as deleted. Returns False if it is not in the log."""
+        if message_id in self._tombstones or self._locate(message_id) is None:
+            return False
+        self._tombstone_file.write(TOMBSTONE.pack(message_id))
+        self._tombstones.add(message_id)
+        self._maybe_sync()
+        return True
+
+    def _maybe_sync(self):
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.flush()
+
+    def flush(self):
+        """Write out and fsync everything appended so far."""
+        self._tombstone_file.flush()
+        os.fsync(self._tombstone_file.fileno())
+        os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    # -- reads -----------------------------------------------------------------------------------------------------
+
+    def _read(self, segment, position, size):
+        if segment.sealed:
+            return segment.map[position:position + size]
+        return os.pread(self._fd, size, position)
+
+    def _read_message(self, segment, position):
+        header = self._read(segment, position, RECORD_HEADER.size)
+        length, _, timestamp, message_id, conversation_id, sender_id = RECORD_HEADER.unpack(header)
+        body = self._read(segment, position + RECORD_HEADER.size, length - RECORD_HEADER.size)
+        return Message(message_id, conversation_id, sender_id, timestamp, body), length
+
+    def _scan(self, segment, position):
+        while position < segment.size:
+            message, length = self._read_message(segment, position)
+            yield message
+            position += length
+
+    def _locate(self, message_id):
+        for segment in reversed(self._segments):
+            position = segment.find_id(message_id)
+            if position is not None:
+                return segment, position
+        return None
+
+    def get(self, message_id, default=None):
+        if message_id in self._tombstones:
+            return default
+        location = self._locate(message_id)
+        if location is None:
+            return default
+        return self._read_message(*location)[0]
+
+    def __contains__(self, message_id):
+        return message_id not in self._tombstones and self._locate(message_id) is not None
+
+    def range(self, start=None, end=None):
+        """Live messages with start <= timestamp < end (either bound optional), oldest first."""
+        segments = [s for s in self._segments if s.first_timestamp() is not None]
+        first = 0 if start is None else max(0, bisect_left(self._first_timestamps, start) - 1)
+        tombstones = self._tombstones
+        for segment in segments[first:]:
+            if end is not None and segment.first_timestamp() >= end:
+                return
+            position = 0 if start is None else segment.seek_time(start)
+            for message in self._scan(segment, position):
+                if start is not None and message.timestamp < start:
+                    continue
+                if end is not None and message.timestamp >= end:
+                    return
+                if message.message_id not in tombstones:
+                    yield message
+
+    def __iter__(self):
+        return self.range()
+
+    def __len__(self):
+        return sum(s.record_count() for s in self._segments) - len(self._tombstones)
+
+    # -- compaction ------------------------------------------------------------------------------------------------
+
+    def compact(self):
+        """Rewrite sealed segments that contain deleted messages. Returns the number of records dropped."""
+        self.flush()
+        dropped = set()
+        for segment in self._segments[:-1]:
+            deleted = [i for i in segment.message_ids() if i in self._tombstones]
+            if not deleted:
+                continue
+            records = [m for m in self._scan(segment, 0) if m.message_id not in self._tombstones]
+            segment.close()
+            tmp_path = segment.path + ".compact"
+            with open(tmp_path, "wb") as f:
+                segment.time_index, segment.id_index, segment.last_indexed = [], {}, None
+                position = 0
+                for message in records:
+                    record = _encode(message)
+                    f.write(record)
+                    self._index_record(segment, message.timestamp, message.message_id, position)
+                    position += len(record)
+                f.flush()
+                os.fsync(f.fileno())
+            # Index files first: after a crash before the new ones are in place they are missing, and missing or
+            # invalid index files are rebuilt from the records on open.
+            os.remove(segment.tidx_path)
+            os.remove(segment.ids_path)
+            os.replace(tmp_path, segment.path)
+            segment.write_indexes()
+            segment.time_index, segment.id_index = [], {}
+            segment.open_sealed()
+            dropped.update(deleted)
+
+        if dropped:
+            self._tombstones -= dropped
+            self._tombstone_file.close()
+            _write_atomic(self._tombstone_path, (TOMBSTONE.pack(message_id) for message_id in self._tombstones))
+            self._tombstone_file = open(self._tombstone_path, "ab")
+            self._refresh_first_timestamps()
+        return len(dropped)
+
+    def close(self):
+        if self._fd is None:
+            return
+        self.flush()
+        self._tombstone_file.close()
+        os.close(self._fd)
+        self._fd = None
+        for segment in self._segments:
+            segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
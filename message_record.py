@@ -0,0 +1,270 @@
+"""
+Compact Message Records
+
+Overview:
+    - case1.py (Task 1) points out the memory overhead of pointer-based structures. In practice most of our RAM goes
+      to the messages themselves: a dict per message costs several hundred bytes before the body is even counted.
+    - Two compact representations:
+        1. Message:      one object per message with __slots__ (no per-instance __dict__).
+        2. MessageBatch: columnar storage. Ids and timestamps live in typed `array` columns, and all bodies live in a
+                         single contiguous buffer with an offsets column, so a million messages are a handful of
+                         Python objects instead of millions.
+
+Zero-copy reads:
+    - Message.body_view() and MessageBatch.body(i) return memoryviews into the existing bytes, no copy.
+    - MessageBatch.column(name) returns a memoryview over a whole column, and MessageBatch.as_numpy() wraps the
+      columns as NumPy arrays over the same memory (NumPy is optional).
+    - A memoryview into a growing batch pins its buffer, so appending while views are alive raises BufferError.
+      Call freeze() once a batch is complete: the body buffer becomes immutable bytes and views never block.
+
+Column widths:
+    - Ids and body offsets start as 32-bit columns (typecodes i and I). The first value that does not fit switches
+      that column to 64 bits (q / Q) for the rest of the batch, so large ids still work and small ones stay small.
+      Timestamps stay 64-bit floats. A row costs 24 bytes of columns until a column is widened.
+
+Measured footprint per message (distinct bodies, 64-bit CPython 3.11, tracemalloc, 100k messages in a list):
+    - 64-byte body:  dict ~ 409 bytes, Message ~ 297 bytes, MessageBatch ~ 90 bytes (4.5x smaller than dict)
+    - 32-byte body:  dict ~ 377 bytes, Message ~ 265 bytes, MessageBatch ~ 57 bytes (6.6x)
+    - 16-byte body:  dict ~ 361 bytes, Message ~ 249 bytes, MessageBatch ~ 41 bytes (8.8x)
+The overhead on top of the body drops from ~345 to ~26 bytes per message (more than 13x). The body itself cannot
+shrink, so the total is cut by 5x only for bodies up to ~50 bytes; at 64 bytes it is 4.5x, at 128 bytes 3x.
+"""
+
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+
+# 32-bit columns switch to these 64-bit typecodes the first time a value does not fit.
+_WIDE_TYPECODES = {"i": "q", "I": "Q"}
+
+
+def _to_bytes(body):
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return bytes(body)
+
+
+def estimate_size(value, _depth=0):
+    """Approximate memory used by value, following containers and __slots__ a few levels deep."""
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, _depth + 1) for item in value)
+    for name in getattr(type(value), "__slots__", ()):
+        size += estimate_size(getattr(value, name, None), _depth + 1)
+    return size
+
+
+class Message:
+    __slots__ = ("message_id", "conversation_id", "sender_id", "timestamp", "body")
+
+    def __init__(self, message_id, conversation_id, sender_id, timestamp, body=b""):
+        self.message_id = message_id
+        self.conversation_id = conversation_id
+        self.sender_id = sender_id
+        self.timestamp = timestamp
+        self.body = _to_bytes(body)
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8")
+
+    def body_view(self):
+        return memoryview(self.body)
+
+    def sort_key(self):
+        return self.timestamp, self.message_id
+
+    def as_tuple(self):
+        return self.message_id, self.conversation_id, self.sender_id, self.timestamp, self.body
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Message(message_id=%r, conversation_id=%r, sender_id=%r, timestamp=%r, body=%r)" % self.as_tuple()
+
+
+class MessageView:
+    """Read-only view of one row of a MessageBatch. Nothing is copied until a field is read."""
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def message_id(self):
+        return self._batch.message_ids[self._index]
+
+    @property
+    def conversation_id(self):
+        return self._batch.conversation_ids[self._index]
+
+    @property
+    def sender_id(self):
+        return self._batch.sender_ids[self._index]
+
+    @property
+    def timestamp(self):
+        return self._batch.timestamps[self._index]
+
+    @property
+    def body(self):
+        return self._batch.body(self._index)
+
+    @property
+    def text(self):
+        return str(self._batch.body(self._index), "utf-8")
+
+    def sort_key(self):
+        return self.timestamp, self.message_id
+
+    def to_message(self):
+        return self._batch.to_message(self._index)
+
+    def __repr__(self):
+        return "MessageView(%r, %d)" % (self._batch, self._index)
+
+
+class MessageBatch:
+    COLUMNS = ("message_ids", "conversation_ids", "sender_ids", "timestamps", "offsets")
+
+    def __init__(self):
+        self.message_ids = array("i")
+        self.conversation_ids = array("i")
+        self.sender_ids = array("i")
+        self.timestamps = array("d")
+        self.offsets = array("I", [0])
+        self._bodies = bytearray()
+        self._frozen = False
+
+    @classmethod
+    def from_messages(cls, messages):
+        batch = cls()
+        batch.extend(messages)
+        return batch
+
+    def append(self, message_id, conversation_id, sender_id, timestamp, body=b""):
+        if self._frozen:
+            raise TypeError("MessageBatch is frozen")
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        count = len(self.timestamps)
+        end = len(self._bodies) + len(body)
+        try:
+            self.message_ids.append(message_id)
+            self.conversation_ids.append(conversation_id)
+            self.sender_ids.append(sender_id)
+            self.timestamps.append(timestamp)
+            self.offsets.append(end)
+        except Exception as exc:
+            self._truncate(count)
+            if isinstance(exc, OverflowError) and self._widen(message_id, conversation_id, sender_id, end):
+                return self.append(message_id, conversation_id, sender_id, timestamp, body)
+            raise
+        self._bodies += body
+
+    def _truncate(self, count):
+        """Drop a partially appended row, leaving `count` complete rows."""
+        for name in self.COLUMNS:
+            del getattr(self, name)[count + (name == "offsets"):]
+
+    def _widen(self, message_id, conversation_id, sender_id, end):
+        """Switch each 32-bit column whose new value does not fit to 64 bits. Returns whether any column changed."""
+        widened = False
+        for name, value in (("message_ids", message_id), ("conversation_ids", conversation_id),
+                            ("sender_ids", sender_id), ("offsets", end)):
+            column = getattr(self, name)
+            wide = _WIDE_TYPECODES.get(column.typecode)
+            if wide is None:
+                continue
+            try:
+                array(column.typecode, (value,))
+            except OverflowError:
+                setattr(self, name, array(wide, column))
+                widened = True
+        return widened
+
+    def extend(self, messages):
+        """Append Message objects (or anything with the same attributes, e.g. MessageView)."""
+        for m in messages:
+            self.append(m.message_id, m.conversation_id, m.sender_id, m.timestamp, m.body)
+
+    def freeze(self):
+        """Make the batch immutable so body views no longer pin a resizable buffer."""
+        if not self._frozen:
+            self._bodies = bytes(self._bodies)
+            self._frozen = True
+        return self
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    def __len__(self):
+        return len(self.message_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [MessageView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MessageBatch index out of range")
+        return MessageView(self, index)
+
+    def __iter__(self):
+        return (MessageView(self, i) for i in range(len(self)))
+
+    def length(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def body(self, index):
+        """Zero-copy memoryview of one message body."""
+        return memoryview(self._bodies)[self.offsets[index]:self.offsets[index + 1]]
+
+    def bodies(self):
+        """Zero-copy memoryview of the whole body buffer (slice it with the offsets column)."""
+        return memoryview(self._bodies)
+
+    def column(self, name):
+        if name not in self.COLUMNS:
+            raise KeyError(name)
+        return memoryview(getattr(self, name))
+
+    def as_numpy(self):
+        """Columns as NumPy arrays sharing memory with the batch. Requires NumPy."""
+        if np is None:
+            raise ImportError("MessageBatch.as_numpy() requires numpy")
+        columns = {name: np.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+                   for name in self.COLUMNS}
+        columns["bodies"] = np.frombuffer(self._bodies, dtype=np.uint8)
+        return columns
+
+    def to_message(self, index):
+        return Message(self.message_ids[index], self.conversation_ids[index], self.sender_ids[index],
+                       self.timestamps[index], bytes(self.body(index)))
+
+    def nbytes(self):
+        """Bytes held by the columns and the body buffer."""
+        columns = sum(len(a) * a.itemsize for a in (getattr(self, name) for name in self.COLUMNS))
+        return columns + len(self._bodies)
+
+    def __repr__(self):
+        return "<MessageBatch of %d messages%s>" % (len(self), " (frozen)" if self._frozen else "")
@@ -0,0 +1,106 @@
+"""
+Message Store
+
+Overview:
+    - Implements the recommendation from case1.py (Task 1): messages are kept in a balanced tree for ordered access,
+      with a hash table next to it for lookups by message id.
+    - The tree is the counted B+ tree from btree.py, keyed by (timestamp, message_id). The id makes every key unique
+      and keeps messages that share a timestamp in a stable order.
+
+Operations (n messages):
+    - add / remove / get by message id:          O(log n)
+    - range(start, end):                         messages in a time window, O(log n + m)
+    - page(start, stop):                         messages by rank ("messages 500-550"), O(log n + m)
+    - rank(message_id), latest(count):           O(log n), O(log n + count)
+
+Usage:
+    store = MessageStore()
+    store.add(message_id, timestamp, message)
+    for message in store.range(start_time, end_time):
+        ...
+"""
+
+import instrumentation
+from btree import BTree, DEFAULT_ORDER
+
+
+class MessageStore:
+    def __init__(self, order=DEFAULT_ORDER):
+        self._tree = BTree(order=order)
+        self._timestamps = {}
+
+    def add(self, message_id, timestamp, message):
+        """Store message under (timestamp, message_id). Re-adding an id moves the message to the new timestamp."""
+        started = instrumentation.start("store.insert") if instrumentation.enabled else 0
+        old = self._timestamps.get(message_id)
+        if old is not None and old != timestamp:
+            self._tree.pop((old, message_id))
+        self._timestamps[message_id] = timestamp
+        self._tree.insert((timestamp, message_id), message)
+        if started:
+            instrumentation.stop("store.insert", started)
+
+    def add_many(self, items):
+        """Store an iterable of (message_id, timestamp, message) tuples."""
+        for message_id, timestamp, message in items:
+            self.add(message_id, timestamp, message)
+
+    def remove(self, message_id):
+        """Remove a message by id and return it. Raises KeyError if the id is unknown."""
+        timestamp = self._timestamps.pop(message_id)
+        return self._tree.pop((timestamp, message_id))
+
+    def discard(self, message_id):
+        if message_id in self._timestamps:
+            self.remove(message_id)
+
+    def get(self, message_id, default=None):
+        started = instrumentation.start("store.lookup") if instrumentation.enabled else 0
+        timestamp = self._timestamps.get(message_id)
+        message = default if timestamp is None else self._tree.get((timestamp, message_id), default)
+        if started:
+            instrumentation.stop("store.lookup", started)
+        return message
+
+    def timestamp_of(self, message_id):
+        return self._timestamps[message_id]
+
+    def __contains__(self, message_id):
+        return message_id in self._timestamps
+
+    def __len__(self):
+        return len(self._tree)
+
+    def __iter__(self):
+        """Messages in chronological order."""
+        return self._tree.values()
+
+    def range(self, start=None, end=None, reverse=False):
+        """Messages with start <= timestamp < end (either bound optional), oldest first unless reverse=True."""
+        # (t,) sorts before every (t, message_id), so these bounds select whole timestamps.
+        low = None if start is None else (start,)
+        high = None if end is None else (end,)
+        return (message for _, message in self._tree.irange(low, high, (True, False), reverse))
+
+    def count_range(self, start=None, end=None):
+        """Number of messages with start <= timestamp < end, in O(log n)."""
+        low = 0 if start is None else self._tree.rank((start,))
+        high = len(self._tree) if end is None else self._tree.rank((end,))
+        return max(0, high - low)
+
+    def page(self, start, stop):
+        """Messages with chronological rank in [start, stop)."""
+        return [message for _, message in self._tree.islice(start, stop)]
+
+    def rank(self, message_id):
+        """Chronological position of a message (0 is the oldest)."""
+        return self._tree.rank((self._timestamps[message_id], message_id))
+
+    def latest(self, count):
+        """The newest `count` messages, newest first."""
+        messages = []
+        for _, message in self._tree.irange(reverse=True):
+            if len(messages) == count:
+                break
+            messages.append(message)
+        return messages
@@ -0,0 +1,107 @@
+"""
+Numeric Sort Path
+
+Overview:
+    - Most of what we sort is homogeneous numeric data (timestamps, unread counts). Comparing and swapping those one
+      Python object at a time, as optimized_bubble_sort and hybrid_sort do, is pure interpreter overhead.
+    - numeric_sort detects int/float buffers and hands them to a batched sort that runs outside the interpreter loop.
+      Anything mixed or non-numeric falls back to hybrid_sort.
+
+Paths:
+    - NumPy arrays (1-D, int/uint/float dtype): ndarray.sort(kind="stable"), which NumPy runs as radix sort for
+      small integer types and as a merge-based sort otherwise. In-place mode works directly on the array buffer.
+    - array.array: viewed through the buffer protocol as a NumPy array (no copy) and sorted in place. This zero-copy
+      mode needs NumPy. Without it the values go through the built-in sort, which creates one Python object per
+      element and a temporary copy of the array, before they are written back into the same array.
+    - Lists of only ints or only floats: list.sort(), which uses CPython's type-specialized comparisons for
+      homogeneous lists and never calls back into Python-level __lt__.
+
+NumPy is optional; every path still works without it, but array.array is then sorted through a temporary copy.
+"""
+
+import array
+
+import instrumentation
+from hybrid_sort import hybrid_sort
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+
+NUMERIC_TYPECODES = frozenset("bBhHiIlLqQfd")
+
+
+def numeric_kind(arr):
+    """Return "numpy", "array" or "list" when arr can take the numeric path, otherwise None."""
+    if np is not None and isinstance(arr, np.ndarray):
+        if arr.ndim == 1 and arr.dtype.kind in "iuf":
+            return "numpy"
+        return None
+    if isinstance(arr, array.array):
+        return "array" if arr.typecode in NUMERIC_TYPECODES else None
+    if isinstance(arr, list):
+        if not arr:
+            return "list"
+        first = type(arr[0])
+        if first is not int and first is not float:
+            return None
+        for item in arr:
+            if type(item) is not first:
+                return None
+        return "list"
+    return None
+
+
+def _sort_ndarray(values, reverse):
+    values.sort(kind="stable")
+    if reverse:
+        values[:] = values[::-1]
+
+
+def numeric_sort(arr, reverse=False, in_place=True):
+    """
+    Sort a numeric buffer with a batched path, falling back to hybrid_sort for mixed or object data.
+
+    In place (the default) the given object is sorted and returned. With in_place=False arr is left untouched and a
+    sorted copy of the same type is returned (a list for types that cannot be built from an iterable).
+    """
+    started = instrumentation.start("sort.numeric_sort") if instrumentation.enabled else 0
+    try:
+        return _numeric_sort(arr, reverse, in_place)
+    finally:
+        if started:
+            instrumentation.stop("sort.numeric_sort", started)
+
+
+def _numeric_sort(arr, reverse, in_place):
+    kind = numeric_kind(arr)
+
+    if kind == "numpy":
+        values = arr if in_place else arr.copy()
+        _sort_ndarray(values, reverse)
+        return values
+
+    if kind == "array":
+        values = arr if in_place else array.array(arr.typecode, arr)
+        if np is not None and len(values):
+            _sort_ndarray(np.asarray(memoryview(values)), reverse)
+        else:
+            values[:] = array.array(values.typecode, sorted(values, reverse=reverse))
+        return values
+
+    if kind == "list":
+        if in_place:
+            arr.sort(reverse=reverse)
+            return arr
+        return sorted(arr, reverse=reverse)
+
+    values = arr if in_place else list(arr)
+    hybrid_sort(values, reverse=reverse)
+    if in_place or type(arr) is list:
+        return values
+    try:
+        return type(arr)(values)
+    except TypeError:
+        return values
@@ -0,0 +1,306 @@
+"""
+Ring Buffer for Message Fan-Out
+
+Overview:
+    - case1.py (Task 2) recommends ring buffers for real-time systems: fixed memory, O(1) writes and reads.
+    - RingBuffer is a single-producer / multi-consumer byte ring over one preallocated bytearray. The producer
+      copies each serialized message into the ring behind a 4-byte length header, so writing allocates nothing per
+      message. Every consumer keeps its own read cursor, so one write fans out to any number of readers.
+
+Positions:
+    - All cursors are absolute byte positions that only grow; the physical offset is position % capacity.
+    - `head` is where the next record is written, `tail` is the start of the oldest record still in the ring.
+    - A record never wraps around the end. If it does not fit, the rest of the ring is skipped (marked with a padding
+      header when there is room for one) and the record starts again at offset 0.
+
+Lock-free-style reads:
+    - The producer publishes a record by advancing `head` after the bytes are written, and advances `tail` before it
+      overwrites old bytes. A consumer copies a record without taking any lock and then re-checks `tail`: if the
+      tail moved past its cursor while copying, the copy may be torn and the read fails with BufferOverrun.
+    - Locks are only taken to sleep and wake up (blocking reads, asyncio waiters and backpressure).
+
+Full-buffer policies:
+    - "drop_oldest":  the producer never waits. Consumers that fall more than `capacity` bytes behind get a
+                      BufferOverrun on their next read and continue from the oldest record still in the ring.
+    - "backpressure": the producer waits until every consumer has read the bytes it is about to overwrite.
+
+Usage:
+    ring = RingBuffer(1 << 20)
+    reader = ring.consumer()
+    ring.write(payload)
+    data = reader.read()               # blocking
+    data = await reader.read_async()   # asyncio
+"""
+
+import asyncio
+import struct
+import threading
+import time
+
+
+HEADER = struct.Struct("<I")
+PADDING = 0xFFFFFFFF
+POLICIES = ("drop_oldest", "backpressure")
+
+
+class BufferOverrun(Exception):
+    """The consumer fell behind and the records it had not read yet were overwritten."""
+
+    def __init__(self, lost_bytes):
+        super().__init__("consumer overrun, %d bytes lost" % lost_bytes)
+        self.lost_bytes = lost_bytes
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RingBuffer:
+    def __init__(self, capacity, policy="drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError("policy must be one of %s" % (POLICIES,))
+        if capacity < 2 * HEADER.size:
+            raise ValueError("capacity is too small")
+        self.capacity = capacity
+        self.policy = policy
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._head = 0
+        self._tail = 0
+        self._consumers = []
+        self._lock = threading.Lock()
+        self._readable = threading.Condition(self._lock)
+        self._writable = threading.Condition(self._lock)
+        self._waiting = 0
+        self._async_waiters = []
+        self._producer_waiting = False
+
+    @property
+    def head(self):
+        return self._head
+
+    @property
+    def tail(self):
+        return self._tail
+
+    def consumer(self, start="latest"):
+        """Register a consumer reading from the newest ("latest") or the oldest ("oldest") record."""
+        with self._lock:
+            consumer = Consumer(self, self._head if start == "latest" else self._tail)
+            self._consumers.append(consumer)
+        return consumer
+
+    def _unregister(self, consumer):
+        with self._lock:
+            if consumer in self._consumers:
+                self._consumers.remove(consumer)
+            self._writable.notify_all()
+
+    # -- producer --------------------------------------------------------------------------------------------------
+
+    def _record_end(self, position):
+        """Position just after the record (or padding) starting at `position`."""
+        capacity = self.capacity
+        offset = position % capacity
+        if capacity - offset < HEADER.size:
+            return position + capacity - offset
+        (length,) = HEADER.unpack_from(self._buffer, offset)
+        if length == PADDING:
+            return position + capacity - offset
+        return position + HEADER.size + length
+
+    def _wait_for_consumers(self, needed, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            # Raise the flag before looking at the cursors: a consumer advances its cursor first and checks the flag
+            # second, so either we see its new cursor here or it sees the flag and notifies us under the lock.
+            self._producer_waiting = True
+            try:
+                while self._consumers and min(c.cursor for c in self._consumers) < needed:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._writable.wait(remaining)
+            finally:
+                self._producer_waiting = False
+        return True
+
+    def write(self, data, timeout=None):
+        """
+        Copy one message into the ring. Returns its position, or None if the backpressure policy timed out.
+        Only one thread may write.
+        """
+        size = len(data)
+        capacity = self.capacity
+        needed = HEADER.size + size
+        if needed > capacity:
+            raise ValueError("message of %d bytes does not fit in a ring of %d bytes" % (size, capacity))
+        head = self._head
+        offset = head % capacity
+        gap = capacity - offset if capacity - offset < needed else 0
+        end = head + gap + needed
+
+        # Make room: everything older than end - capacity will be overwritten.
+        limit = end - capacity
+        if self._tail < limit:
+            if self.policy == "backpressure" and not self._wait_for_consumers(limit, timeout):
+                return None
+            tail = self._tail
+            while tail < limit:
+                tail = self._record_end(tail)
+            self._tail = tail
+
+        buffer = self._buffer
+        if gap:
+            if gap >= HEADER.size:
+                HEADER.pack_into(buffer, offset, PADDING)
+            head += gap
+            offset = 0
+        HEADER.pack_into(buffer, offset, size)
+        self._view[offset + HEADER.size:offset + needed] = data
+        self._head = end
+        if self._waiting or self._async_waiters:
+            self._wake()
+        return head
+
+    def _wake(self):
+        with self._lock:
+            self._readable.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+class Consumer:
+    """A read cursor into a RingBuffer. Each consumer sees every record written after it started."""
+
+    def __init__(self, ring, cursor):
+        self.ring = ring
+        self.cursor = cursor
+        self.overruns = 0
+        self.lost_bytes = 0
+
+    def lag(self):
+        """Bytes written but not read yet."""
+        return self.ring._head - self.cursor
+
+    def _overrun(self):
+        ring = self.ring
+        lost = ring._tail - self.cursor
+        self.cursor = ring._tail
+        self.overruns += 1
+        self.lost_bytes += lost
+        raise BufferOverrun(lost)
+
+    def _locate(self):
+        """Skip padding and return (offset, length) of the next record, or None if there is nothing to read."""
+        ring = self.ring
+        capacity = ring.capacity
+        while True:
+            if self.cursor >= ring._head:
+                return None
+            if self.cursor < ring._tail:
+                self._overrun()
+            offset = self.cursor % capacity
+            if capacity - offset < HEADER.size:
+                self.cursor += capacity - offset
+                continue
+            (length,) = HEADER.unpack_from(ring._buffer, offset)
+            if length == PADDING:
+                self.cursor += capacity - offset
+                continue
+            if length > capacity - offset - HEADER.size:
+                # Header overwritten while we were looking at it.
+                self._overrun()
+            return offset, length
+
+    def _finish(self, length):
+        ring = self.ring
+        if self.cursor < ring._tail:
+            self._overrun()
+        self.cursor += HEADER.size + length
+        # Cursor first, flag second (see RingBuffer._wait_for_consumers).
+        if ring._producer_waiting:
+            with ring._lock:
+                ring._writable.notify_all()
+
+    def try_read(self):
+        """Return the next message as bytes, or None if there is none yet. Raises BufferOverrun."""
+        located = self._locate()
+        if located is None:
+            return None
+        offset, length = located
+        start = offset + HEADER.size
+        data = bytes(self.ring._view[start:start + length])
+        self._finish(length)
+        return data
+
+    def try_read_into(self, out):
+        """Copy the next message into the writable buffer `out` without allocating; returns its size or None."""
+        located = self._locate()
+        if located is None:
+            return None
+        offset, length = located
+        if length > len(out):
+            raise ValueError("buffer of %d bytes is too small for a %d byte message" % (len(out), length))
+        start = offset + HEADER.size
+        memoryview(out)[:length] = self.ring._view[start:start + length]
+        self._finish(length)
+        return length
+
+    def _wait(self, timeout):
+        ring = self.ring
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with ring._lock:
+            ring._waiting += 1
+            try:
+                while self.cursor >= ring._head:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    ring._readable.wait(remaining)
+            finally:
+                ring._waiting -= 1
+        return True
+
+    def read(self, block=True, timeout=None):
+        """Return the next message, waiting for one if block is true. Returns None on timeout."""
+        while True:
+            data = self.try_read()
+            if data is not None or not block:
+                return data
+            if not self._wait(timeout):
+                return None
+
+    def read_into(self, out, block=True, timeout=None):
+        while True:
+            size = self.try_read_into(out)
+            if size is not None or not block:
+                return size
+            if not self._wait(timeout):
+                return None
+
+    async def read_async(self):
+        """Await the next message."""
+        ring = self.ring
+        while True:
+            data = self.try_read()
+            if data is not None:
+                return data
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with ring._lock:
+                if self.cursor < ring._head:
+                    continue
+                ring._async_waiters.append((loop, future))
+            await future
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.read_async()
+
+    def close(self):
+        self.ring._unregister(self)
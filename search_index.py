@@ -0,0 +1,320 @@
+"""
+Full-Text Search Index
+
+Overview:
+    - case1.py (Task 3) suggests an inverted index or trie for keyword search. SearchIndex is an inverted index over
+      message bodies with a sorted term dictionary for prefix search, so keyword search no longer scans every message.
+    - Messages are added incrementally as they arrive; each one gets an internal document number in arrival order.
+
+Postings:
+    - Every term has one compressed postings list (a bytearray). Per document it stores the document-number delta,
+      the number of positions and the position deltas, all as varints. Document numbers only grow, so appending a
+      new message never rewrites existing postings, and most deltas fit in a single byte.
+
+Queries (search("...")):
+    - words              all words must occur (AND)
+    - a OR b             either side may match; OR binds looser than AND ("a b OR c" is "(a AND b) OR c")
+    - "exact phrase"     the words must occur next to each other, in order (checked with the stored positions)
+    - prefix*            any term starting with prefix (sorted term dictionary, O(log T + matches))
+    Results are message ids ranked by recency (newest timestamp first).
+
+Removal: remove() only hides a document. compact() rewrites the postings without hidden documents and renumbers the
+rest; save() compacts first, and a shard compacts after handing conversations to another shard.
+
+Persistence: save(path) writes a snapshot (term dictionary, document table and the raw postings) atomically, and
+SearchIndex.load(path) reads it back without re-tokenizing anything.
+"""
+
+import heapq
+import json
+import os
+import re
+import struct
+
+from sorted_container import SortedBlockList
+
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+MAGIC = b"SIDX1\n"
+HEADER_SIZE = struct.Struct("<Q")
+
+
+def tokenize(text):
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        text = bytes(text).decode("utf-8", "replace")
+    return [token.lower() for token in TOKEN.findall(text)]
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, position):
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def encode_posting(docnum_delta, positions, out):
+    """Append one document's entry (docnum delta, position count, position deltas) to a postings list."""
+    encode_varint(docnum_delta, out)
+    encode_varint(len(positions), out)
+    previous = -1
+    for p in positions:
+        encode_varint(p - previous, out)
+        previous = p
+
+
+def decode_postings(data, with_positions=False):
+    """Yield (docnum, positions) pairs from a compressed postings list (positions is None unless requested)."""
+    position, docnum, end = 0, -1, len(data)
+    while position < end:
+        delta, position = decode_varint(data, position)
+        docnum += delta
+        count, position = decode_varint(data, position)
+        if with_positions:
+            positions, last = [], -1
+            for _ in range(count):
+                gap, position = decode_varint(data, position)
+                last += gap
+                positions.append(last)
+            yield docnum, positions
+        else:
+            for _ in range(count):
+                while data[position] & 0x80:
+                    position += 1
+                position += 1
+            yield docnum, None
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings = {}
+        self._last_doc = {}
+        self._terms = SortedBlockList()
+        self._message_ids = []
+        self._timestamps = []
+        self._docnums = {}
+        self._deleted = set()
+
+    # -- indexing --------------------------------------------------------------------------------------------------
+
+    def add(self, message_id, text, timestamp):
+        """Index one message. Re-adding a message id replaces the earlier version."""
+        if message_id in self._docnums:
+            self.remove(message_id)
+        docnum = len(self._message_ids)
+        self._message_ids.append(message_id)
+        self._timestamps.append(timestamp)
+        self._docnums[message_id] = docnum
+
+        positions = {}
+        for i, token in enumerate(tokenize(text)):
+            positions.setdefault(token, []).append(i)
+        for term, term_positions in positions.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = bytearray()
+                self._terms.add(term)
+                last = -1
+            else:
+                last = self._last_doc[term]
+            encode_posting(docnum - last, term_positions, postings)
+            self._last_doc[term] = docnum
+
+    def add_message(self, message):
+        """Index a Message (or MessageView) from message_record.py."""
+        self.add(message.message_id, message.body, message.timestamp)
+
+    def remove(self, message_id):
+        """Hide a message from results. Its postings stay until compact()."""
+        docnum = self._docnums.pop(message_id)
+        self._deleted.add(docnum)
+
+    def compact(self):
+        """
+        Rewrite the postings without removed documents and renumber the rest (in the same order), dropping terms
+        that no longer occur. Returns the number of documents dropped.
+        """
+        deleted = self._deleted
+        if not deleted:
+            return 0
+        renumbered, message_ids, timestamps = {}, [], []
+        for docnum, (message_id, timestamp) in enumerate(zip(self._message_ids, self._timestamps)):
+            if docnum not in deleted:
+                renumbered[docnum] = len(message_ids)
+                message_ids.append(message_id)
+                timestamps.append(timestamp)
+
+        postings, last_doc = {}, {}
+        for term in self._terms:
+            out, last = bytearray(), -1
+            for docnum, positions in decode_postings(self._postings[term], True):
+                new = renumbered.get(docnum)
+                if new is not None:
+                    encode_posting(new - last, positions, out)
+                    last = new
+            if out:
+                postings[term] = out
+                last_doc[term] = last
+
+        self._postings, self._last_doc = postings, last_doc
+        self._terms = SortedBlockList(postings)
+        self._message_ids, self._timestamps = message_ids, timestamps
+        self._docnums = {message_id: docnum for docnum, message_id in enumerate(message_ids)}
+        self._deleted = set()
+        return len(deleted)
+
+    def timestamp_of(self, message_id):
+        return self._timestamps[self._docnums[message_id]]
+
+    def __len__(self):
+        return len(self._docnums)
+
+    def __contains__(self, message_id):
+        return message_id in self._docnums
+
+    # -- term dictionary -------------------------------------------------------------------------------------------
+
+    def terms(self, prefix=""):
+        """Indexed terms starting with prefix, in sorted order."""
+        for term in self._terms.irange(prefix, None):
+            if not term.startswith(prefix):
+                return
+            yield term
+
+    def document_frequency(self, term):
+        return sum(1 for _ in decode_postings(self._postings.get(term, b"")))
+
+    # -- query evaluation ------------------------------------------------------------------------------------------
+
+    def _docs(self, term):
+        return {docnum for docnum, _ in decode_postings(self._postings.get(term, b""))}
+
+    def _prefix_docs(self, prefix):
+        docs = set()
+        for term in self.terms(prefix):
+            docs |= self._docs(term)
+        return docs
+
+    def _phrase_docs(self, words):
+        if not words:
+            return set()
+        if len(words) == 1:
+            return self._docs(words[0])
+        candidates = self._intersect([self._docs(word) for word in words])
+        if not candidates:
+            return candidates
+        positions = []
+        for word in words:
+            positions.append({docnum: set(p) for docnum, p in decode_postings(self._postings[word], True)
+                              if docnum in candidates})
+        matches = set()
+        for docnum in candidates:
+            first, rest = positions[0][docnum], positions[1:]
+            if any(all(start + offset in rest[offset - 1][docnum] for offset in range(1, len(words)))
+                   for start in first):
+                matches.add(docnum)
+        return matches
+
+    @staticmethod
+    def _intersect(sets):
+        sets = sorted(sets, key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            if not result:
+                break
+            result &= s
+        return result
+
+    def _word_docs(self, word):
+        if word.endswith("*") and len(word) > 1:
+            return self._prefix_docs(word[:-1].lower())
+        tokens = tokenize(word)
+        if not tokens:
+            return None
+        return self._intersect([self._docs(token) for token in tokens])
+
+    def match(self, query):
+        """Internal document numbers matching query."""
+        groups, current = [], []
+        for phrase, word in QUERY_TOKEN.findall(query):
+            if word == "OR":
+                groups.append(current)
+                current = []
+                continue
+            if word == "AND":
+                continue
+            docs = self._word_docs(word) if word else self._phrase_docs(tokenize(phrase))
+            if docs is not None:
+                current.append(docs)
+        groups.append(current)
+
+        result = set()
+        for clauses in groups:
+            if clauses:
+                result |= self._intersect(clauses)
+        return result - self._deleted
+
+    def search(self, query, limit=50):
+        """Message ids matching query, newest first."""
+        timestamps = self._timestamps
+        docnums = heapq.nlargest(limit, self.match(query), key=lambda d: (timestamps[d], d))
+        return [self._message_ids[d] for d in docnums]
+
+    # -- persistence -----------------------------------------------------------------------------------------------
+
+    def save(self, path):
+        """Compact, then write the snapshot, so removed documents are never persisted."""
+        self.compact()
+        terms = list(self._terms)
+        header = {
+            "terms": terms,
+            "lengths": [len(self._postings[t]) for t in terms],
+            "last_doc": [self._last_doc[t] for t in terms],
+            "message_ids": self._message_ids,
+            "timestamps": self._timestamps,
+            "deleted": sorted(self._deleted),
+        }
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER_SIZE.pack(len(encoded)))
+            f.write(encoded)
+            for term in terms:
+                f.write(self._postings[term])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a search index" % path)
+            (size,) = HEADER_SIZE.unpack(f.read(HEADER_SIZE.size))
+            header = json.loads(f.read(size))
+            blob = f.read()
+        index = cls()
+        position = 0
+        for term, length, last in zip(header["terms"], header["lengths"], header["last_doc"]):
+            index._postings[term] = bytearray(blob[position:position + length])
+            index._last_doc[term] = last
+            position += length
+        index._terms.update(header["terms"])
+        index._message_ids = header["message_ids"]
+        index._timestamps = header["timestamps"]
+        index._deleted = set(header["deleted"])
+        index._docnums = {message_id: docnum for docnum, message_id in enumerate(index._message_ids)
+                          if docnum not in index._deleted}
+        return index
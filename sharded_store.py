@@ -0,0 +1,431 @@
+"""
+Sharded Message Store
+
+Overview:
+    - Everything in case1.py (Task 1) assumes one in-memory structure, and one Python process uses one core.
+      ShardedStore hash-partitions conversations across N worker processes. Each shard owns complete conversations:
+      a MessageStore per conversation, a ConversationIndex for recent activity and a SearchIndex for its messages.
+    - Requests travel over multiprocessing pipes. Single-conversation requests go to one shard; cross-shard queries
+      (global recent activity, search) are scattered to every shard at once and the sorted partial results are
+      gathered with a streaming k-way merge (heapq.merge).
+
+Consistent hashing:
+    - Shards sit on a hash ring, each at `replicas` virtual points, and a conversation belongs to the first point
+      clockwise from its hash. Adding a shard only takes over the arcs in front of its own points, so only the
+      conversations on those arcs move (about 1/N of them); every other conversation stays where it is.
+    - add_shard() and remove_shard() wait for running requests and hold new ones back until the moved conversations
+      have arrived and the new ring is in place, so a write during a rebalance is never sent to the old owner.
+
+Usage:
+    with ShardedStore(num_shards=4) as store:
+        store.add(conversation_id, message)          # message_record.Message
+        store.range(conversation_id, start, end)
+        for conversation_id, last_activity in store.recent(20):
+            ...
+        store.search("project deadline")
+"""
+
+import contextlib
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import threading
+from bisect import bisect_right
+
+from conversation_index import ConversationIndex
+from message_store import MessageStore
+from search_index import SearchIndex
+
+
+DEFAULT_REPLICAS = 128
+DEFAULT_PAGE_SIZE = 256
+
+
+def stable_hash(value):
+    """A 64-bit hash that is the same in every process (unlike hash(), which is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, shards=(), replicas=DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points = []
+        self._owners = []
+        for shard in shards:
+            self.add(shard)
+
+    def add(self, shard):
+        for i in range(self.replicas):
+            point = stable_hash((shard, i))
+            index = bisect_right(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, shard)
+
+    def remove(self, shard):
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != shard]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def owner(self, key):
+        if not self._points:
+            raise LookupError("hash ring is empty")
+        index = bisect_right(self._points, stable_hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def shards(self):
+        return sorted(set(self._owners))
+
+    def copy(self):
+        ring = HashRing(replicas=self.replicas)
+        ring._points = list(self._points)
+        ring._owners = list(self._owners)
+        return ring
+
+
+# -- shard worker ------------------------------------------------------------------------------------------------------
+
+class _Shard:
+    def __init__(self):
+        self.stores = {}
+        self.conversations = ConversationIndex()
+        self.search_index = SearchIndex()
+
+    def add(self, conversation_id, message):
+        store = self.stores.get(conversation_id)
+        if store is None:
+            store = self.stores[conversation_id] = MessageStore()
+        store.add(message.message_id, message.timestamp, message)
+        self.conversations.touch(conversation_id, message.timestamp, message.message_id)
+        self.search_index.add(message.message_id, message.body, message.timestamp)
+        return True
+
+    def add_many(self, items):
+        for conversation_id, message in items:
+            self.add(conversation_id, message)
+        return len(items)
+
+    def range(self, conversation_id, start, end):
+        store = self.stores.get(conversation_id)
+        return list(store.range(start, end)) if store is not None else []
+
+    def latest(self, conversation_id, count):
+        store = self.stores.get(conversation_id)
+        return store.latest(count) if store is not None else []
+
+    def recent(self, cursor, limit):
+        conversations, next_cursor = self.conversations.page(cursor, limit)
+        return [(c.sort_key(), c.conversation_id, c.last_activity) for c in conversations], next_cursor
+
+    def search(self, query, limit):
+        index = self.search_index
+        return [(index.timestamp_of(message_id), message_id) for message_id in index.search(query, limit)]
+
+    def export(self, ring, me):
+        """Remove and return every conversation that `ring` no longer assigns to this shard."""
+        moved = []
+        for conversation_id in list(self.stores):
+            if ring.owner(conversation_id) != me:
+                store = self.stores.pop(conversation_id)
+                messages = list(store)
+                for message in messages:
+                    self.search_index.remove(message.message_id)
+                self.conversations.remove(conversation_id)
+                moved.append((conversation_id, messages))
+        if moved:
+            self.search_index.compact()
+        return moved
+
+    def import_(self, conversations):
+        for conversation_id, messages in conversations:
+            for message in messages:
+                self.add(conversation_id, message)
+        return len(conversations)
+
+    def stats(self):
+        return {
+            "conversations": len(self.stores),
+            "messages": sum(len(store) for store in self.stores.values()),
+        }
+
+
+def _shard_main(conn):
+    shard = _Shard()
+    handlers = {
+        "add": shard.add,
+        "add_many": shard.add_many,
+        "range": shard.range,
+        "latest": shard.latest,
+        "recent": shard.recent,
+        "search": shard.search,
+        "export": shard.export,
+        "import": shard.import_,
+        "stats": shard.stats,
+    }
+    while True:
+        try:
+            op, args = conn.recv()
+        except EOFError:
+            return
+        if op == "stop":
+            conn.send((True, None))
+            return
+        try:
+            conn.send((True, handlers[op](*args)))
+        except Exception as exc:  # errors go back to the caller instead of killing the shard
+            conn.send((False, exc))
+
+
+class _ShardClient:
+    def __init__(self, name, context):
+        self.name = name
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_shard_main, args=(child,), name=name, daemon=True)
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()
+
+    def send(self, op, *args):
+        """Hold the shard until receive() reads the reply, so requests and replies never interleave."""
+        self.lock.acquire()
+        try:
+            self.conn.send((op, args))
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def receive(self):
+        try:
+            ok, result = self.conn.recv()
+        finally:
+            self.lock.release()
+        if not ok:
+            raise result
+        return result
+
+    def call(self, op, *args):
+        self.send(op, *args)
+        return self.receive()
+
+
+class _RebalanceGate:
+    """
+    Lets any number of requests run together, or one rebalance alone. A waiting rebalance blocks new requests, so a
+    steady stream of requests cannot starve it.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._rebalancing = False
+        self._waiting = 0
+
+    @contextlib.contextmanager
+    def request(self):
+        with self._condition:
+            while self._rebalancing or self._waiting:
+                self._condition.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if not self._active:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def rebalance(self):
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._rebalancing or self._active:
+                    self._condition.wait()
+            finally:
+                self._waiting -= 1
+            self._rebalancing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._rebalancing = False
+                self._condition.notify_all()
+
+
+class ShardedStore:
+    def __init__(self, num_shards=None, replicas=DEFAULT_REPLICAS, context=None):
+        self._context = context or multiprocessing.get_context()
+        self._names = ("shard-%d" % i for i in itertools.count())
+        self._shards = {}
+        self._ring = HashRing(replicas=replicas)
+        self._listeners = []
+        self._gate = _RebalanceGate()
+        for _ in range(num_shards or multiprocessing.cpu_count()):
+            name = next(self._names)
+            self._shards[name] = _ShardClient(name, self._context)
+            self._ring.add(name)
+
+    def _shard_for(self, conversation_id):
+        return self._shards[self._ring.owner(conversation_id)]
+
+    @staticmethod
+    def _exchange(requests):
+        """
+        Send every (shard, op, args) request first, then collect the replies, so the shards work in parallel.
+        Shards are taken in name order, so concurrent multi-shard requests cannot deadlock on the shard locks, and
+        every sent request has its reply read (and its shard released) before the first error is raised.
+        """
+        order = sorted(range(len(requests)), key=lambda i: requests[i][0].name)
+        results = [None] * len(requests)
+        sent = []
+        error = None
+        try:
+            for i in order:
+                shard, op, args = requests[i]
+                shard.send(op, *args)
+                sent.append(i)
+        finally:
+            for i in sent:
+                try:
+                    results[i] = requests[i][0].receive()
+                except Exception as exc:
+                    if error is None:
+                        error = exc
+        if error is not None:
+            raise error
+        return results
+
+    def _scatter(self, op, *args):
+        return self._exchange([(shard, op, args) for shard in self._shards.values()])
+
+    # -- single-shard requests -------------------------------------------------------------------------------------
+
+    def add_listener(self, callback):
+        """Call callback(conversation_id, message) after every stored message (e.g. MessageCache.on_message)."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify(self, items):
+        for callback in self._listeners:
+            for conversation_id, message in items:
+                callback(conversation_id, message)
+
+    def _call(self, conversation_id, op, *args):
+        with self._gate.request():
+            return self._shard_for(conversation_id).call(op, conversation_id, *args)
+
+    def add(self, conversation_id, message):
+        self._call(conversation_id, "add", message)
+        self._notify(((conversation_id, message),))
+
+    def add_many(self, items):
+        """Add (conversation_id, message) pairs, one request per shard."""
+        by_shard = {}
+        with self._gate.request():
+            for conversation_id, message in items:
+                by_shard.setdefault(self._ring.owner(conversation_id), []).append((conversation_id, message))
+            self._exchange([(self._shards[name], "add_many", (batch,)) for name, batch in by_shard.items()])
+        for batch in by_shard.values():
+            self._notify(batch)
+
+    def range(self, conversation_id, start=None, end=None):
+        return self._call(conversation_id, "range", start, end)
+
+    def latest(self, conversation_id, count):
+        return self._call(conversation_id, "latest", count)
+
+    # -- cross-shard queries ---------------------------------------------------------------------------------------
+
+    def _shard_recent(self, shard, page_size, items, cursor):
+        yield from items
+        while cursor is not None:
+            with self._gate.request():
+                items, cursor = shard.call("recent", cursor, page_size)
+            yield from items
+
+    def iter_recent(self, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Stream (conversation_id, last_activity) over all shards in inbox order. The first page of every shard is
+        fetched in one scatter; later pages are fetched lazily, one shard at a time, as the merge needs them.
+        """
+        with self._gate.request():
+            shards = list(self._shards.values())
+            first_pages = self._exchange([(shard, "recent", (None, page_size)) for shard in shards])
+        streams = [self._shard_recent(shard, page_size, items, cursor)
+                   for shard, (items, cursor) in zip(shards, first_pages)]
+        for _, conversation_id, last_activity in heapq.merge(*streams, key=lambda item: item[0]):
+            yield conversation_id, last_activity
+
+    def recent(self, count):
+        """The `count` most recently active conversations across all shards."""
+        if count < 1:
+            return []
+        return list(itertools.islice(self.iter_recent(page_size=count), count))
+
+    def search(self, query, limit=50):
+        """Message ids matching query on any shard, newest first."""
+        with self._gate.request():
+            partials = self._scatter("search", query, limit)
+        merged = heapq.merge(*partials, reverse=True)
+        return [message_id for _, message_id in itertools.islice(merged, limit)]
+
+    def stats(self):
+        with self._gate.request():
+            return dict(zip(self._shards, self._scatter("stats")))
+
+    # -- rebalancing -----------------------------------------------------------------------------------------------
+
+    # Export, import and the ring swap run under the gate's rebalance side, so no request sees (or writes to) a
+    # conversation between leaving its old shard and arriving at its new one.
+
+    def add_shard(self):
+        """Start a new shard and move over only the conversations the ring now assigns to it."""
+        with self._gate.rebalance():
+            name = next(self._names)
+            ring = self._ring.copy()
+            ring.add(name)
+            new_shard = _ShardClient(name, self._context)
+            exported = self._exchange([(shard, "export", (ring, shard.name)) for shard in self._shards.values()])
+            new_shard.call("import", list(itertools.chain.from_iterable(exported)))
+            self._shards[name] = new_shard
+            self._ring = ring
+        return name
+
+    def remove_shard(self, name):
+        """Stop a shard and move its conversations to their new owners."""
+        with self._gate.rebalance():
+            shard = self._shards[name]
+            ring = self._ring.copy()
+            ring.remove(name)
+            moved = shard.call("export", ring, name)
+            del self._shards[name]
+            self._ring = ring
+            self._import(moved)
+        shard.call("stop")
+        shard.process.join()
+
+    def _import(self, conversations):
+        by_shard = {}
+        for conversation_id, messages in conversations:
+            by_shard.setdefault(self._ring.owner(conversation_id), []).append((conversation_id, messages))
+        self._exchange([(self._shards[name], "import", (batch,)) for name, batch in by_shard.items()])
+
+    def shards(self):
+        return list(self._shards)
+
+    def close(self):
+        for shard in self._shards.values():
+            try:
+                shard.call("stop")
+            except (EOFError, OSError):
+                pass
+            shard.process.join()
+        self._shards.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
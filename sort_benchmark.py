@@ -0,0 +1,282 @@
+"""
+Sorting Benchmark and Operation Counter
+
+Overview:
+    - Task 1 in case2.py counts the key operations of Bubble Sort (comparisons, swaps, passes) on paper. This module
+      measures them, together with wall time and peak memory, for optimized_bubble_sort and the newer sorts.
+    - Results are written as JSON so runs can be diffed for regressions, and the best/worst-case claims from the
+      docstrings are checked against the measured counts.
+
+What is measured:
+    - comparisons: every <, <=, >, >= or == between two elements (elements are wrapped in a counting proxy).
+    - writes:      element assignments into the array, slice assignments count one per element.
+    - swaps:       writes // 2, i.e. the number of exchanges for swap-based sorts like Bubble Sort.
+    - passes:      sweeps that start at index 0, which are exactly the outer-loop passes of Bubble Sort that compare
+                   anything. A read of index 0 only starts a new sweep if the current sweep went past index 1, so the
+                   second read of arr[0] in a swap at j=0 is not counted. (Bubble Sort's last outer iteration has an
+                   empty inner loop and never touches the array, so a reversed input shows n - 1 passes.)
+    - wall_time_s and peak_memory_bytes come from separate, uninstrumented runs, so the counting proxies do not
+      distort them.
+
+Inputs: sorted, reversed, nearly_sorted, random and many_duplicates, at sizes from 10 to 10^6. Quadratic sorts are
+skipped above --max-quadratic-size, since a 10^6 Bubble Sort would never finish.
+
+Usage:
+    python sort_benchmark.py --sizes 10 100 1000 --out bench.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from case2 import optimized_bubble_sort
+from hybrid_sort import hybrid_sort
+from numeric_sort import numeric_sort
+
+
+DEFAULT_SIZES = (10, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6)
+DEFAULT_MAX_QUADRATIC_SIZE = 5000
+DISTRIBUTIONS = ("sorted", "reversed", "nearly_sorted", "random", "many_duplicates")
+
+
+class OperationCounter:
+    __slots__ = ("comparisons", "writes", "passes")
+
+    def __init__(self):
+        self.comparisons = 0
+        self.writes = 0
+        self.passes = 0
+
+    def as_dict(self):
+        return {
+            "comparisons": self.comparisons,
+            "writes": self.writes,
+            "swaps": self.writes // 2,
+            "passes": self.passes,
+        }
+
+
+class Counted:
+    """Proxy for one element that counts every comparison made against it."""
+
+    __slots__ = ("value", "counter")
+
+    def __init__(self, value, counter):
+        self.value = value
+        self.counter = counter
+
+    def __lt__(self, other):
+        self.counter.comparisons += 1
+        return self.value < other.value
+
+    def __le__(self, other):
+        self.counter.comparisons += 1
+        return self.value <= other.value
+
+    def __gt__(self, other):
+        self.counter.comparisons += 1
+        return self.value > other.value
+
+    def __ge__(self, other):
+        self.counter.comparisons += 1
+        return self.value >= other.value
+
+    def __eq__(self, other):
+        self.counter.comparisons += 1
+        return self.value == other.value
+
+    __hash__ = None
+
+
+class TrackedList(list):
+    """List that counts element writes and sweeps starting at index 0."""
+
+    def __init__(self, iterable, counter):
+        super().__init__(iterable)
+        self.counter = counter
+        self._sweep_end = None  # highest index read in the current sweep, None before the first sweep
+
+    def __getitem__(self, index):
+        if type(index) is int:
+            if index == 0 and (self._sweep_end is None or self._sweep_end > 1):
+                self.counter.passes += 1
+                self._sweep_end = 0
+            elif self._sweep_end is not None and index > self._sweep_end:
+                self._sweep_end = index
+        return super().__getitem__(index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.counter.writes += len(range(*index.indices(len(self))))
+        else:
+            self.counter.writes += 1
+        super().__setitem__(index, value)
+
+
+# name -> (sort function, is quadratic, can be instrumented)
+ALGORITHMS = {
+    "optimized_bubble_sort": (optimized_bubble_sort, True, True),
+    "hybrid_sort": (hybrid_sort, False, True),
+    "numeric_sort": (numeric_sort, False, False),
+}
+
+
+def make_input(distribution, size, rng):
+    if distribution == "sorted":
+        return list(range(size))
+    if distribution == "reversed":
+        return list(range(size, 0, -1))
+    if distribution == "nearly_sorted":
+        data = list(range(size))
+        for _ in range(max(1, size // 100)):
+            i, j = rng.randrange(size), rng.randrange(size)
+            data[i], data[j] = data[j], data[i]
+        return data
+    if distribution == "random":
+        return [rng.random() for _ in range(size)]
+    if distribution == "many_duplicates":
+        return [rng.randrange(10) for _ in range(size)]
+    raise ValueError("unknown distribution: %r" % (distribution,))
+
+
+def measure_time(sort, data, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        arr = list(data)
+        start = time.perf_counter()
+        sort(arr)
+        best = min(best, time.perf_counter() - start)
+    return best, arr
+
+
+def measure_peak_memory(sort, data):
+    arr = list(data)
+    tracemalloc.start()
+    try:
+        sort(arr)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def count_operations(sort, data):
+    counter = OperationCounter()
+    arr = TrackedList((Counted(value, counter) for value in data), counter)
+    sort(arr)
+    return counter.as_dict()
+
+
+def run_case(name, distribution, size, seed=0, repeat=3):
+    sort, _, countable = ALGORITHMS[name]
+    data = make_input(distribution, size, random.Random(seed))
+    wall_time, result = measure_time(sort, data, repeat)
+    record = {
+        "algorithm": name,
+        "distribution": distribution,
+        "size": size,
+        "wall_time_s": wall_time,
+        "peak_memory_bytes": measure_peak_memory(sort, data),
+        "sorted_ok": result == sorted(data),
+    }
+    if countable:
+        record.update(count_operations(sort, data))
+    return record
+
+
+def check_claims(results):
+    """Compare the measured counts with the best/worst-case claims from case2.py and hybrid_sort.py."""
+    claims = []
+
+    def claim(record, description, ok):
+        claims.append({
+            "algorithm": record["algorithm"],
+            "distribution": record["distribution"],
+            "size": record["size"],
+            "claim": description,
+            "ok": bool(ok),
+        })
+
+    for record in results:
+        if "comparisons" not in record or record["size"] < 2:
+            continue
+        n = record["size"]
+        name, distribution = record["algorithm"], record["distribution"]
+        if name == "optimized_bubble_sort" and distribution == "sorted":
+            claim(record, "best case O(n): one pass, n-1 comparisons, no swaps",
+                  record["passes"] == 1 and record["comparisons"] == n - 1 and record["swaps"] == 0)
+        elif name == "optimized_bubble_sort" and distribution == "reversed":
+            claim(record, "worst case O(n^2): n(n-1)/2 comparisons and swaps",
+                  record["comparisons"] == n * (n - 1) // 2 and record["swaps"] == n * (n - 1) // 2)
+            claim(record, "worst case: a pass for every outer iteration (the n-th has an empty inner loop)",
+                  record["passes"] == n - 1)
+        elif name == "hybrid_sort" and distribution in ("sorted", "reversed"):
+            claim(record, "best case O(n): a single run, n-1 comparisons", record["comparisons"] == n - 1)
+        elif name == "hybrid_sort":
+            claim(record, "worst case O(n log n): at most n*ceil(log2 n) + n comparisons",
+                  record["comparisons"] <= n * math.ceil(math.log2(n)) + n)
+    return claims
+
+
+def run_benchmarks(algorithms=None, sizes=DEFAULT_SIZES, distributions=DISTRIBUTIONS, seed=0, repeat=3,
+                   max_quadratic_size=DEFAULT_MAX_QUADRATIC_SIZE, progress=None):
+    results, skipped = [], []
+    for name in algorithms or ALGORITHMS:
+        quadratic = ALGORITHMS[name][1]
+        for size in sizes:
+            for distribution in distributions:
+                if quadratic and size > max_quadratic_size:
+                    skipped.append({"algorithm": name, "distribution": distribution, "size": size})
+                    continue
+                record = run_case(name, distribution, size, seed=seed, repeat=repeat)
+                results.append(record)
+                if progress is not None:
+                    progress(record)
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "max_quadratic_size": max_quadratic_size,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+        "skipped": skipped,
+        "claims": check_claims(results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and count operations of the sorting algorithms.")
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(ALGORITHMS), default=None)
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-quadratic-size", type=int, default=DEFAULT_MAX_QUADRATIC_SIZE)
+    parser.add_argument("--out", default="-", help="output JSON file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    def progress(record):
+        print("%-22s %-16s %8d  %.6fs" % (record["algorithm"], record["distribution"], record["size"],
+                                          record["wall_time_s"]), file=sys.stderr)
+
+    report = run_benchmarks(args.algorithms, args.sizes, args.distributions, args.seed, args.repeat,
+                            args.max_quadratic_size, progress)
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    failed = [c for c in report["claims"] if not c["ok"]]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
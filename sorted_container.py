@@ -0,0 +1,256 @@
+"""
+Sorted Container (sorted list of lists)
+
+Overview:
+    - Re-sorting the whole array every time a few messages arrive costs at least one full pass with
+      optimized_bubble_sort, and O(n log n) with anything else. SortedBlockList keeps the data sorted instead and
+      merges new batches into it.
+    - Values live in blocks (plain Python lists) of roughly `load` elements, plus a list with the maximum key of each
+      block. Finding the right block is a bisect over the maxes, and inserting into a block only shifts `load`
+      elements, so inserts stay cheap at millions of elements. Blocks that grow past 2 * load are split.
+
+Operations:
+    - add(value):        O(log n + load)
+    - update(batch):     O(k log k) to sort the batch, then one linear merge per block the batch touches
+                         (at most O(k log n + n) overall)
+    - remove(value):     O(log n + load)
+    - sl[i], index(v):   O(log n) once positions are indexed (rebuilt lazily after writes, O(n / load))
+    - irange(lo, hi):    O(log n + m) for m matches
+
+Equal keys keep their insertion order, also across batches.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+
+DEFAULT_LOAD = 1000
+
+
+class SortedBlockList:
+    def __init__(self, iterable=(), key=None, load=DEFAULT_LOAD):
+        if load < 4:
+            raise ValueError("load must be at least 4")
+        self._key = key
+        self._load = load
+        self._len = 0
+        self._keys = []
+        self._values = []
+        self._maxes = []
+        self._offsets = None
+        self.update(iterable)
+
+    def _key_of(self, value):
+        return value if self._key is None else self._key(value)
+
+    def _build(self, values):
+        load = self._load
+        self._values = [values[i:i + load] for i in range(0, len(values), load)]
+        if self._key is None:
+            self._keys = self._values
+        else:
+            self._keys = [[self._key(v) for v in block] for block in self._values]
+        self._maxes = [block[-1] for block in self._keys]
+        self._len = len(values)
+        self._offsets = None
+
+    def _split(self, pos):
+        keys_block = self._keys[pos]
+        if len(keys_block) <= 2 * self._load:
+            return
+        values_block = self._values[pos]
+        load = self._load
+        new_keys = [keys_block[i:i + load] for i in range(0, len(keys_block), load)]
+        self._keys[pos:pos + 1] = new_keys
+        if self._key is not None:
+            self._values[pos:pos + 1] = [values_block[i:i + load] for i in range(0, len(values_block), load)]
+        self._maxes[pos:pos + 1] = [block[-1] for block in new_keys]
+
+    def _delete(self, pos, idx):
+        keys_block = self._keys[pos]
+        del keys_block[idx]
+        if self._key is not None:
+            del self._values[pos][idx]
+        self._len -= 1
+        self._offsets = None
+        if keys_block:
+            self._maxes[pos] = keys_block[-1]
+        else:
+            del self._keys[pos]
+            if self._key is not None:
+                del self._values[pos]
+            del self._maxes[pos]
+
+    def add(self, value):
+        key = self._key_of(value)
+        if not self._maxes:
+            self._build([value])
+            return
+        pos = bisect_right(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._keys[pos].append(key)
+            if self._key is not None:
+                self._values[pos].append(value)
+            self._maxes[pos] = key
+        else:
+            keys_block = self._keys[pos]
+            idx = bisect_right(keys_block, key)
+            keys_block.insert(idx, key)
+            if self._key is not None:
+                self._values[pos].insert(idx, value)
+        self._len += 1
+        self._offsets = None
+        self._split(pos)
+
+    def update(self, iterable):
+        """Merge a batch of values into the container."""
+        batch = sorted(iterable, key=self._key)
+        if not batch:
+            return
+        if not self._len:
+            self._build(batch)
+            return
+        batch_keys = batch if self._key is None else [self._key(v) for v in batch]
+        maxes = self._maxes
+        last = len(maxes) - 1
+        touched = []
+        start = 0
+        for pos in range(len(maxes)):
+            # Keys equal to this block's max belong after it, like in add(): older equal items may continue in the
+            # next blocks, and new ones go after all of them.
+            stop = len(batch) if pos == last else bisect_left(batch_keys, maxes[pos], start)
+            if stop > start:
+                # The block and the batch slice are two sorted runs, which list.sort merges in linear time.
+                if self._key is None:
+                    self._keys[pos].extend(batch[start:stop])
+                    self._keys[pos].sort()
+                else:
+                    merged = sorted(chain(self._values[pos], batch[start:stop]), key=self._key)
+                    self._values[pos] = merged
+                    self._keys[pos] = [self._key(v) for v in merged]
+                maxes[pos] = self._keys[pos][-1]
+                touched.append(pos)
+                start = stop
+                if start == len(batch):
+                    break
+        self._len += len(batch)
+        self._offsets = None
+        for pos in reversed(touched):
+            self._split(pos)
+
+    def _locate(self, value):
+        key = self._key_of(value)
+        pos = bisect_left(self._maxes, key)
+        while pos < len(self._maxes):
+            keys_block = self._keys[pos]
+            idx = bisect_left(keys_block, key)
+            while idx < len(keys_block) and not key < keys_block[idx]:
+                if self._values[pos][idx] == value:
+                    return pos, idx
+                idx += 1
+            if idx < len(keys_block):
+                break
+            pos += 1
+        return None
+
+    def remove(self, value):
+        location = self._locate(value)
+        if location is None:
+            raise ValueError("%r not in SortedBlockList" % (value,))
+        self._delete(*location)
+
+    def discard(self, value):
+        location = self._locate(value)
+        if location is not None:
+            self._delete(*location)
+
+    def clear(self):
+        self._build([])
+
+    def _index_offsets(self):
+        if self._offsets is None:
+            offsets, total = [], 0
+            for block in self._keys:
+                offsets.append(total)
+                total += len(block)
+            self._offsets = offsets
+        return self._offsets
+
+    def _position(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("SortedBlockList index out of range")
+        offsets = self._index_offsets()
+        pos = bisect_right(offsets, index) - 1
+        return pos, index - offsets[pos]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step == 1:
+                return list(self._slice(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        pos, idx = self._position(index)
+        return self._values[pos][idx]
+
+    def __delitem__(self, index):
+        self._delete(*self._position(index))
+
+    def _slice(self, start, stop):
+        if start >= stop:
+            return
+        pos, idx = self._position(start)
+        remaining = stop - start
+        while remaining > 0 and pos < len(self._values):
+            block = self._values[pos][idx:idx + remaining]
+            yield from block
+            remaining -= len(block)
+            pos, idx = pos + 1, 0
+
+    def bisect_left(self, key):
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._index_offsets()[pos] + bisect_left(self._keys[pos], key)
+
+    def bisect_right(self, key):
+        pos = bisect_right(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._index_offsets()[pos] + bisect_right(self._keys[pos], key)
+
+    def index(self, value):
+        location = self._locate(value)
+        if location is None:
+            raise ValueError("%r not in SortedBlockList" % (value,))
+        pos, idx = location
+        return self._index_offsets()[pos] + idx
+
+    def irange(self, min_key=None, max_key=None, inclusive=(True, True)):
+        """Iterate over values whose key lies between min_key and max_key."""
+        if min_key is None:
+            start = 0
+        else:
+            start = self.bisect_left(min_key) if inclusive[0] else self.bisect_right(min_key)
+        if max_key is None:
+            stop = self._len
+        else:
+            stop = self.bisect_right(max_key) if inclusive[1] else self.bisect_left(max_key)
+        return self._slice(start, stop)
+
+    def __contains__(self, value):
+        return self._locate(value) is not None
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._values)
+
+    def __reversed__(self):
+        return chain.from_iterable(reversed(block) for block in reversed(self._values))
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, list(self))